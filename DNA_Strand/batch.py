@@ -0,0 +1,167 @@
+import argparse
+import csv
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from org import longest_substrand
+from sequences import chunk_pairs, pair_chunks
+
+COLUMNS = ['id1', 'id2', 'length1', 'length2', 'unit_length', 'unit']
+# A chunk of pairs is sent to a worker once it holds this many pairs or bases
+CHUNK_PAIRS = 10_000
+CHUNK_BASES = 8_000_000
+# Rows buffered into one Parquet row group
+ROW_GROUP_SIZE = 100_000
+
+
+def find_units(pairs):
+    """Result row of longest_substrand for each (name1, sequence1, name2, sequence2)."""
+    rows = []
+    for name1, sequence1, name2, sequence2 in pairs:
+        unit = longest_substrand(sequence1, sequence2) or ''
+        rows.append((name1, name2, len(sequence1), len(sequence2), len(unit), unit))
+    return rows
+
+
+def find_units_in_chunk(chunk):
+    """find_units over a raw chunk from sequences.pair_chunks, parsed in the worker."""
+    return find_units(chunk_pairs(*chunk))
+
+
+class TsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file, delimiter='\t', lineterminator='\n')
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes the rows as zstd compressed row groups; needs pyarrow."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([('id1', pa.string()), ('id2', pa.string()), ('length1', pa.int64()),
+                                 ('length2', pa.int64()), ('unit_length', pa.int64()), ('unit', pa.string())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            columns = [list(column) for column in zip(*self.rows)]
+            self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(path, output_format=None):
+    """Result writer for path; the format is taken from the extension unless given."""
+    output_format = output_format or ('parquet' if path.endswith('.parquet') else 'tsv')
+    if output_format == 'tsv':
+        return TsvWriter(path)
+    if output_format == 'parquet':
+        return ParquetWriter(path)
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def group_pairs(pairs, chunk_pairs=CHUNK_PAIRS, chunk_bases=CHUNK_BASES):
+    """Group pairs into lists bounded by pair count and total bases."""
+    chunk, bases = [], 0
+    for pair in pairs:
+        chunk.append(pair)
+        bases += len(pair[1]) + len(pair[3])
+        if len(chunk) >= chunk_pairs or bases >= chunk_bases:
+            yield chunk
+            chunk, bases = [], 0
+    if chunk:
+        yield chunk
+
+
+def run_chunks(function, chunks, writer, workers=None):
+    """
+    Apply function to every chunk in a process pool and write the returned
+    rows. At most two chunks per worker are in flight and results are
+    written in input order as their chunk finishes, so memory stays bounded
+    whatever the input size. Returns the number of rows written.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    if workers == 1:
+        for chunk in chunks:
+            rows = function(chunk)
+            writer.write(rows)
+            count += len(rows)
+        return count
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= 2 * workers:
+                rows = pending.popleft().result()
+                writer.write(rows)
+                count += len(rows)
+        while pending:
+            rows = pending.popleft().result()
+            writer.write(rows)
+            count += len(rows)
+    return count
+
+
+def process_pairs(pairs, output, workers=None, chunk_size=CHUNK_PAIRS, output_format=None):
+    """
+    Run longest_substrand over an iterable of (name1, sequence1, name2,
+    sequence2) in a process pool and write one result row per pair to
+    output. Returns the number of pairs processed.
+    """
+    writer = open_writer(output, output_format)
+    try:
+        return run_chunks(find_units, group_pairs(pairs, chunk_size), writer, workers)
+    finally:
+        writer.close()
+
+
+def process_files(path1, output, path2=None, workers=None, chunk_size=CHUNK_PAIRS, output_format=None):
+    """
+    process_pairs over the records of one or two FASTA/FASTQ files (see
+    sequences.pair_chunks). The main process only cuts the files into raw
+    chunks of chunk_size pairs; parsing happens in the workers.
+    """
+    writer = open_writer(output, output_format)
+    try:
+        return run_chunks(find_units_in_chunk, pair_chunks(path1, path2, chunk_size), writer, workers)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the common repeating unit of FASTA/FASTQ sequence pairs")
+    parser.add_argument("input", help="FASTA/FASTQ file, optionally .gz")
+    parser.add_argument("mates", nargs="?", help="second file; without it consecutive records are paired")
+    parser.add_argument("-o", "--output", default="units.tsv", help="a .tsv or .parquet file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_PAIRS)
+    args = parser.parse_args()
+    try:
+        count = process_files(args.input, args.output, args.mates, workers=args.workers, chunk_size=args.chunk_size)
+        print(f"{count} pairs written to {args.output}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,76 @@
+import argparse
+import hashlib
+import os
+import random
+import time
+
+from batch import process_files
+
+BASES = 'ACGT'
+
+
+def generate_pairs(path1, path2, pairs, max_unit=8, max_repeats=12, mutation_rate=0.3, seed=0):
+    """
+    Write two FASTA files whose record i forms pair i. Both strands of a pair
+    repeat a random unit; in mutation_rate of the pairs one base is changed
+    so they have no common unit.
+    """
+    rng = random.Random(seed)
+    with open(path1, 'w', encoding='utf-8') as file1, open(path2, 'w', encoding='utf-8') as file2:
+        for i in range(pairs):
+            unit = ''.join(rng.choice(BASES) for _ in range(rng.randint(1, max_unit)))
+            strand1 = unit * rng.randint(1, max_repeats)
+            strand2 = unit * rng.randint(1, max_repeats)
+            if rng.random() < mutation_rate:
+                j = rng.randrange(len(strand2))
+                strand2 = strand2[:j] + rng.choice(BASES.replace(strand2[j], '')) + strand2[j + 1:]
+            file1.write(f">a{i}\n{strand1}\n")
+            file2.write(f">b{i}\n{strand2}\n")
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_benchmark(pairs, worker_counts, chunk_size, data_dir, output_format):
+    os.makedirs(data_dir, exist_ok=True)
+    path1 = os.path.join(data_dir, f"strands_{pairs}_1.fa")
+    path2 = os.path.join(data_dir, f"strands_{pairs}_2.fa")
+    if not (os.path.exists(path1) and os.path.exists(path2)):
+        print(f"Generating {pairs} pairs...")
+        generate_pairs(path1, path2, pairs)
+    size_mb = (os.path.getsize(path1) + os.path.getsize(path2)) / 1e6
+    print(f"{pairs} pairs, {size_mb:.1f} MB of FASTA, {os.cpu_count()} CPUs")
+
+    reference = None
+    for workers in worker_counts:
+        output = os.path.join(data_dir, f"units_{workers}.{output_format}")
+        start = time.perf_counter()
+        count = process_files(path1, output, path2, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        # Parquet files embed writer metadata, so only the TSV outputs are compared byte for byte
+        digest = file_digest(output) if output_format == 'tsv' else None
+        reference = reference or digest
+        same = "" if digest is None else "same output" if digest == reference else "DIFFERENT OUTPUT"
+        print(f"{workers:>3} workers: {elapsed:8.2f} s  {count / elapsed:12,.0f} pairs/s  {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batch repeating-unit pipeline")
+    parser.add_argument("--pairs", type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument("--workers", default=None, help="comma separated worker counts, default 1,2,4,...,CPUs")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--format", choices=["tsv", "parquet"], default="tsv")
+    parser.add_argument("--data-dir", default="bench_data")
+    args = parser.parse_args()
+
+    if args.workers:
+        worker_counts = [int(workers) for workers in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        worker_counts = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+    run_benchmark(args.pairs, worker_counts, args.chunk_size, args.data_dir, args.format)
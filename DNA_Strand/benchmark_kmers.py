@@ -0,0 +1,73 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from kmers import KmerIndex
+
+
+def generate_strands(count, min_length=100, max_length=200, genome_length=20_000_000, mutation_rate=0.01, seed=0):
+    """Strands cut at random places from one random genome, with mutation_rate of their bases changed."""
+    rng = np.random.default_rng(seed)
+    genome = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, genome_length)]
+    lengths = rng.integers(min_length, max_length + 1, count)
+    starts = rng.integers(0, genome_length - max_length, count)
+    data = genome[np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())]
+    mutated = rng.random(len(data)) < mutation_rate
+    data[mutated] = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, np.count_nonzero(mutated))]
+    text = data.tobytes().decode('ascii')
+    ends = np.cumsum(lengths).tolist()
+    return [text[end - length:end] for end, length in zip(ends, lengths.tolist())], starts
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(count, k, window, queries, min_shared, data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    strands, _ = timed(generate_strands, count)
+    strands, starts = strands
+    bases = sum(len(strand) for strand in strands)
+    print(f"{count:,} strands, {bases / 1e6:.0f} Mb, k={k}, window={window}")
+
+    index, elapsed = timed(KmerIndex.build, strands, k, window)
+    size_mb = (index.hashes.nbytes + index.strands.nbytes) / 1e6
+    print(f"build:   {elapsed:8.2f} s  {len(index.hashes):,} entries, {size_mb:.0f} MB")
+
+    path = os.path.join(data_dir, f"strands_{count}_k{k}_w{window}.kmers")
+    _, elapsed = timed(index.save, path)
+    print(f"save:    {elapsed:8.2f} s")
+    index, elapsed = timed(KmerIndex.load, path)
+    print(f"load:    {elapsed:8.2f} s  (memory mapped)")
+
+    rng = np.random.default_rng(1)
+    picked = rng.choice(count, queries, replace=False)
+    found = matches = 0
+    start = time.perf_counter()
+    for strand in picked.tolist():
+        result = index.shared_kmers(strands[strand], min_shared)
+        matches += len(result)
+        found += any(hit == strand for hit, _ in result)
+    elapsed = time.perf_counter() - start
+    print(f"query:   {elapsed / queries * 1000:8.2f} ms per strand  {matches / queries:.1f} strands sharing "
+          f">= {min_shared} k-mers on average, query strand itself found {found}/{queries}")
+
+    # Overlap expected from the layout: strands whose genome interval overlaps the query's by k or more
+    overlaps = np.abs(starts[picked[:20], None] - starts[None, :]) <= 200 - k
+    print(f"about {overlaps.sum(axis=1).mean():.1f} strands per query overlap it in the genome")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the k-mer index over many short strands")
+    parser.add_argument("--strands", type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument("-k", type=int, default=21)
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--min-shared", type=int, default=2)
+    parser.add_argument("--data-dir", default="bench_data")
+    args = parser.parse_args()
+    run_benchmark(args.strands, args.k, args.window, args.queries, args.min_shared, args.data_dir)
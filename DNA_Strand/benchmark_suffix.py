@@ -0,0 +1,69 @@
+import argparse
+import random
+import time
+
+from packed import PackedSequence
+from suffix import SuffixArray, common_substring_span, tandem_repeats
+
+BASES = 'ACGT'
+
+
+def generate_strand(length, repeats=100, max_unit=12, rng=None):
+    """Random strand of about length bases with repeats tandem repeats of random units planted in it."""
+    rng = rng or random.Random(0)
+    parts, size = [], 0
+    gap = length // (repeats + 1)
+    while size < length:
+        part = ''.join(rng.choice(BASES) for _ in range(gap))
+        if len(parts) < 2 * repeats:
+            unit = ''.join(rng.choice(BASES) for _ in range(rng.randint(1, max_unit)))
+            part += unit * rng.randint(3, 50)
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)[:length]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(length, shared, seed=0):
+    rng = random.Random(seed)
+    strand1 = generate_strand(length, rng=rng)
+    strand2 = generate_strand(length, rng=rng)
+    # Plant a long shared substring so the answer is known
+    common = strand1[length // 3:length // 3 + shared]
+    strand2 = strand2[:length // 2] + common + strand2[length // 2 + shared:]
+    print(f"Two strands of {length:,} bases, {shared:,} base substring planted in both")
+
+    index, elapsed = timed(SuffixArray, strand1)
+    print(f"suffix array:              {elapsed:8.2f} s  ({len(index.levels)} doubling levels)")
+    _, elapsed = timed(lambda: index.lcp)
+    print(f"lcp array:                 {elapsed:8.2f} s")
+
+    (start1, start2, size), elapsed = timed(common_substring_span, strand1, strand2)
+    found = size >= shared and strand1[start1:start1 + size] == strand2[start2:start2 + size]
+    print(f"longest common substring:  {elapsed:8.2f} s  length {size:,}  {'ok' if found else 'MISSED'}")
+
+    packed1, packed2 = PackedSequence.from_string(strand1), PackedSequence.from_string(strand2)
+    (_, _, packed_size), elapsed = timed(common_substring_span, packed1, packed2)
+    print(f"  from packed strands:     {elapsed:8.2f} s  length {packed_size:,}")
+
+    runs, elapsed = timed(tandem_repeats, strand1, index=index)
+    longest = max(runs, key=lambda run: run.end - run.start, default=None)
+    print(f"tandem repeats:            {elapsed:8.2f} s  {len(runs):,} runs, longest {longest}")
+
+    periodic = strand1[:1000] * (length // 1000)
+    runs, elapsed = timed(tandem_repeats, periodic)
+    print(f"tandem repeats, periodic:  {elapsed:8.2f} s  {len(runs):,} runs (worst case for doubling)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the suffix array strand queries")
+    parser.add_argument("--length", type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument("--shared", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run_benchmark(args.length, args.shared, args.seed)
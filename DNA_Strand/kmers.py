@@ -0,0 +1,299 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from sequences import read_sequences
+
+MAGIC = b'KMERIDX1'
+ALIGNMENT = 64
+# Strands hashed together per step while building
+BUILD_CHUNK = 50_000
+# Hash given to k-mers containing anything but A, C, G or T; it never wins a minimizer window
+NO_KMER = np.uint64(2 ** 64 - 1)
+
+_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate('ACGT'):
+    _CODES[ord(_base)] = _CODES[ord(_base.lower())] = _code
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: an invertible mix, so distinct k-mers keep distinct hashes."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def kmer_hashes(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Hash of the k-mer starting at every position of an array of base codes
+    (0-3, anything else invalid). The rolling Rabin-Karp hash with base 4 and
+    modulus 4**k is the 2-bit encoding of the k-mer, exact for k <= 32; it
+    is built for all positions at once by doubling the covered length, then
+    mixed so minimizers are not biased towards poly-A. k-mers with an
+    invalid base get NO_KMER.
+    """
+    m = len(codes) - k + 1
+    if m <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    invalid = np.concatenate(([0], np.cumsum(codes > 3)))
+    valid = invalid[k:] == invalid[:m]
+
+    base = (codes & 3).astype(np.uint64)
+    # part encodes the width bases at each position; value, the first covered bases of each k-mer,
+    # grows by the parts matching the binary digits of k
+    part, width = base, 1
+    value, covered = None, 0
+    while covered < k:
+        if k & width:
+            size = len(codes) - covered - width + 1
+            following = part[covered:covered + size]
+            value = following.copy() if value is None else (value[:size] << np.uint64(2 * width)) | following
+            covered += width
+        if covered < k:
+            part = (part[:-width] << np.uint64(2 * width)) | part[width:]
+            width *= 2
+    hashes = _mix(value[:m])
+    hashes[~valid] = NO_KMER
+    return hashes
+
+
+def _window_minimizers(hashes: np.ndarray, window: int) -> np.ndarray:
+    # Smallest hash of every run of window consecutive k-mers
+    if window <= 1 or len(hashes) < window:
+        return hashes if window <= 1 else hashes[:0]
+    return np.lib.stride_tricks.sliding_window_view(hashes, window).min(axis=1)
+
+
+def _sequence_codes(sequence) -> np.ndarray:
+    if hasattr(sequence, 'codes'):
+        return sequence.codes()
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii', errors='replace')
+    return _CODES[np.frombuffer(sequence, dtype=np.uint8)]
+
+
+def _distinct(values: np.ndarray) -> np.ndarray:
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+
+class KmerIndex:
+    """
+    Index from k-mer hashes to the strands containing them, as two parallel
+    arrays sorted by hash: strands[i] contains a k-mer hashing to hashes[i],
+    with strand ids ascending within a hash. With window > 1 only the
+    (window, k) minimizers of each strand are kept: the smallest hash of
+    every window consecutive k-mers, about 2 / (window + 1) of them. A query
+    reads only the entries of its own k-mers, so its cost does not grow with
+    the number of strands indexed.
+    """
+
+    def __init__(self, k: int, window: int, hashes: np.ndarray, strands: np.ndarray, count: int,
+                 names: Optional[List[str]] = None):
+        self.k = k
+        self.window = window
+        self.hashes = hashes
+        self.strands = strands
+        self.count = count
+        self.names = names
+
+    def __len__(self) -> int:
+        return self.count
+
+    def sample(self, sequence) -> np.ndarray:
+        """Distinct k-mer hashes (minimizers if window > 1) of one strand, as indexed."""
+        codes = _sequence_codes(sequence)
+        if self.window > 1:
+            # The same invalid padding as between strands in build, so end windows match
+            padding = np.full(self.window, 4, dtype=np.uint8)
+            codes = np.concatenate((padding, codes, padding))
+        hashes = _window_minimizers(kmer_hashes(codes, self.k), self.window)
+        hashes = _distinct(hashes)
+        return hashes[:len(hashes) - int(len(hashes) > 0 and hashes[-1] == NO_KMER)]
+
+    @classmethod
+    def build(cls, sequences: Iterable[str], k: int = 21, window: int = 1,
+              names: Optional[List[str]] = None) -> 'KmerIndex':
+        """
+        Index the strands of an iterable, numbered from 0 in order. Strands
+        are hashed BUILD_CHUNK at a time as one buffer, separated by window
+        invalid bases, so no k-mer or minimizer window spans two strands;
+        windows reaching into that padding keep the minimizers of strand ends.
+        """
+        if not 1 <= k <= 32:
+            raise ValueError("k must be between 1 and 32")
+        separator = 'N' * max(window, 1)
+        all_hashes, all_strands = [], []
+        count = 0
+        sequences = iter(sequences)
+        while True:
+            chunk = [str(sequence) for sequence in islice(sequences, BUILD_CHUNK)]
+            if not chunk:
+                break
+            text = separator + separator.join(chunk) + separator
+            codes = _CODES[np.frombuffer(text.encode('ascii', errors='replace'), dtype=np.uint8)]
+            # The padding before a strand only starts invalid k-mers, so its label is never used
+            strand = np.repeat(np.arange(count, count + len(chunk), dtype=np.int32),
+                               [len(sequence) + len(separator) for sequence in chunk])
+            strand = np.concatenate((np.full(len(separator), count, dtype=np.int32), strand))
+            hashes = kmer_hashes(codes, k)
+            if window > 1 and len(hashes) < window:
+                # Fewer k-mers than one window: with the padding, every strand of
+                # the chunk is shorter than k, so there is nothing to index
+                hashes, strand = hashes[:0], strand[:0]
+            elif window > 1:
+                # Each window is credited to the strand of its smallest hash
+                windows = np.lib.stride_tricks.sliding_window_view(hashes, window)
+                best = np.argmin(windows, axis=1) + np.arange(len(windows))
+                # Consecutive windows mostly pick the same k-mer; best never decreases
+                best = best[np.concatenate(([True], best[1:] != best[:-1]))]
+                hashes, strand = hashes[best], strand[best]
+            else:
+                strand = strand[:len(hashes)]
+            keep = hashes != NO_KMER
+            hashes, strand = hashes[keep], strand[keep]
+            # Strands are ascending in the buffer, so a stable sort keeps them ascending per hash
+            order = np.argsort(hashes, kind='stable')
+            hashes, strand = hashes[order], strand[order]
+            first = np.ones(len(hashes), dtype=bool)
+            first[1:] = (hashes[1:] != hashes[:-1]) | (strand[1:] != strand[:-1])
+            all_hashes.append(hashes[first])
+            all_strands.append(strand[first])
+            count += len(chunk)
+
+        hashes = np.concatenate(all_hashes) if all_hashes else np.zeros(0, dtype=np.uint64)
+        strands = np.concatenate(all_strands) if all_strands else np.zeros(0, dtype=np.int32)
+        order = np.argsort(hashes, kind='stable')
+        return cls(k, window, hashes[order], strands[order], count, names)
+
+    @classmethod
+    def from_file(cls, path: str, k: int = 21, window: int = 1) -> 'KmerIndex':
+        """Index every record of a FASTA/FASTQ file, keeping the record names."""
+        names = []
+
+        def sequences():
+            for name, sequence in read_sequences(path):
+                names.append(name)
+                yield sequence
+
+        return cls.build(sequences(), k, window, names)
+
+    def shared_kmers(self, sequence, min_shared: int = 1) -> List[Tuple[int, int]]:
+        """
+        (strand id, shared) for every indexed strand sharing at least
+        min_shared of the query's distinct k-mers (minimizers if window > 1),
+        most shared first.
+        """
+        query = self.sample(sequence)
+        left = np.searchsorted(self.hashes, query, 'left')
+        right = np.searchsorted(self.hashes, query, 'right')
+        sizes = right - left
+        if not sizes.sum():
+            return []
+        # Gather all matching entries in one vectorized step
+        offsets = np.cumsum(sizes) - sizes
+        hits = np.sort(self.strands[np.repeat(left - offsets, sizes) + np.arange(sizes.sum())])
+        run_starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+        strands, shared = hits[run_starts], np.diff(np.append(run_starts, len(hits)))
+        keep = shared >= min_shared
+        strands, shared = strands[keep], shared[keep]
+        order = np.lexsort((strands, -shared))
+        return list(zip(strands[order].tolist(), shared[order].tolist()))
+
+    def save(self, path: str):
+        """
+        Write the index as one file: magic, header length, a JSON header and
+        the raw arrays, each aligned so load can memory map them. The file is
+        written next to its final name and renamed into place.
+        """
+        arrays = {'hashes': self.hashes, 'strands': self.strands}
+        if self.names is not None:
+            encoded = [name.encode('utf-8') for name in self.names]
+            arrays['names/data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            arrays['names/offsets'] = np.concatenate(([0], np.cumsum([len(name) for name in encoded],
+                                                                       dtype=np.int64)))
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+        header = json.dumps({'k': self.k, 'window': self.window, 'count': self.count,
+                             'arrays': layout}).encode('utf-8')
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+                for name, array in arrays.items():
+                    file.seek(data_start + layout[name]['offset'])
+                    file.write(np.ascontiguousarray(array).tobytes())
+                file.truncate(data_start + offset)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'KmerIndex':
+        """Memory map an index written by save; only the pages a query touches are read."""
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a k-mer index")
+        (header_length,) = struct.unpack_from('<Q', mapped, len(MAGIC))
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(mapped[len(MAGIC) + 8:header_end])
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            arrays[name] = np.frombuffer(mapped, dtype=np.dtype(spec['dtype']), count=int(np.prod(spec['shape'])),
+                                         offset=data_start + spec['offset']).reshape(spec['shape'])
+        names = None
+        if 'names/data' in arrays:
+            data, offsets = arrays['names/data'].tobytes(), arrays['names/offsets']
+            names = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return cls(header['k'], header['window'], arrays['hashes'], arrays['strands'], header['count'], names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query a k-mer index of FASTA/FASTQ strands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index every record of a file")
+    build.add_argument("input")
+    build.add_argument("index")
+    build.add_argument("-k", type=int, default=21)
+    build.add_argument("--window", type=int, default=1, help="minimizer window; 1 keeps every k-mer")
+    query = commands.add_parser("query", help="strands sharing k-mers with each record of a file")
+    query.add_argument("index")
+    query.add_argument("queries")
+    query.add_argument("-t", "--min-shared", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            index = KmerIndex.from_file(args.input, args.k, args.window)
+            index.save(args.index)
+            print(f"{len(index)} strands, {len(index.hashes)} entries written to {args.index}")
+        else:
+            index = KmerIndex.load(args.index)
+            for name, sequence in read_sequences(args.queries):
+                for strand, shared in index.shared_kmers(sequence, args.min_shared):
+                    label = index.names[strand] if index.names else strand
+                    print(f"{name}\t{label}\t{shared}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -1,36 +1,38 @@
+import random
+
+from org import longest_substrand as find_common_unit, longest_substrand_reference
+from packed import PackedSequence
+
+
 def longest_substrand(str1, str2):
     # Print input values
     print(f"Input: str1 = '{str1}', str2 = '{str2}'")
     
-    smallest = str1 if len(str1) <= len(str2) else str2
-    smallest_original = smallest
-    biggest = str1 if smallest == str2 else str2
-    
-    smallest_length = len(smallest)
-    biggest_length = len(biggest)
-    
-    print(f"smallest = '{smallest}', length = {smallest_length}")
-    print(f"biggest = '{biggest}', length = {biggest_length}")
+    # gcd of the lengths plus one periodicity check instead of trying every prefix
+    result = find_common_unit(str1, str2) or ''
     
-    while len(smallest) > 0:
-        n = biggest_length // len(smallest)
-        m = smallest_length // len(smallest)
-        
-        print(f"Current substring: '{smallest}', length = {len(smallest)}")
-        print(f"n = {n}, m = {m}")
-        print(f"smallest * n = '{smallest * n}'")
-        print(f"smallest * m = '{smallest * m}'")
-        print(f"Checking if '{smallest * n}' == '{biggest}' and '{smallest * m}' == '{smallest_original}'")
-        
-        if smallest * n == biggest and smallest * m == smallest_original:
-            print(f"Found match! Returning: '{smallest}'")
-            return smallest
-        
-        smallest = smallest[:-1]
-        print(f"No match, reducing substring to: '{smallest}'")
-    
-    print("No common substrand found, returning empty string")
-    return ''
+    if result:
+        print(f"Found match! Returning: '{result}'")
+    else:
+        print("No common substrand found, returning empty string")
+    return result
+
+
+def check_against_reference(trials=2000, seed=0):
+    # Random strands built from a shared unit, some with one base mutated
+    rng = random.Random(seed)
+    for _ in range(trials):
+        unit = ''.join(rng.choice('ACGT') for _ in range(rng.randint(1, 4)))
+        str1 = unit * rng.randint(0, 6)
+        str2 = unit * rng.randint(0, 6)
+        if str2 and rng.random() < 0.3:
+            i = rng.randrange(len(str2))
+            str2 = str2[:i] + rng.choice('ACGT') + str2[i + 1:]
+        expected = longest_substrand_reference(str1, str2)
+        assert find_common_unit(str1, str2) == expected, (str1, str2, expected)
+        packed = find_common_unit(PackedSequence.from_string(str1), PackedSequence.from_string(str2))
+        assert (packed is None) == (expected is None) and packed == expected, (str1, str2, expected)
+    print(f"All {trials} random pairs match the reference, as str and packed")
 
 
 # Test cases
@@ -46,6 +48,9 @@ def run_test_cases():
     print("\n=== Test Case 3 ===")
     result3 = longest_substrand('ATAG', 'ATAGATAGATAGATAG')
     print(f"Result: '{result3}'")
+    
+    print("\n=== Reference Check ===")
+    check_against_reference()
 
 
 # Run the tests
@@ -1,5 +1,57 @@
+from math import gcd
+
+
+
 def longest_substrand(str1, str2):
 
+  # Both strands are repeats of a common unit only if they are repeats of the
+
+  # prefix of length gcd(len1, len2), and that prefix is then the longest unit.
+
+  # count() finds len // g non-overlapping copies only if they tile the strand.
+
+  if not str1 or not str2:
+
+    return
+
+  g = gcd(len(str1), len(str2))
+
+  unit = str1[:g]
+
+  if isinstance(str1, str) != isinstance(str2, str):
+
+    # A str next to a packed.PackedSequence is packed too; imported here, not at
+
+    # the top, because numpy loads this module while it is itself being imported
+
+    from packed import PackedSequence
+
+    str1, str2 = (s if isinstance(s, PackedSequence) else PackedSequence.from_string(s) for s in (str1, str2))
+
+    unit = str1[:g]
+
+  if hasattr(str1, 'has_period'):
+
+    # Packed strands compare shifted copies of themselves with numpy instead
+
+    if str1.has_period(g) and str2.has_period(g) and str2[:g] == unit:
+
+      return unit
+
+    return
+
+  if str1.count(unit) * g == len(str1) and str2.count(unit) * g == len(str2):
+
+    return unit
+
+  return
+
+
+
+# Original O(L^2) trial loop, kept as the reference for equivalence checks
+
+def longest_substrand_reference(str1, str2):
+
   smallest = str1 if len(str1) <= len(str2) else str2
 
   smallest_original = smallest
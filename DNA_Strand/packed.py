@@ -0,0 +1,145 @@
+from typing import Union
+
+import numpy as np
+
+BASES = 'ACGT'
+# Bases handled per step by conversions and comparisons, bounding temporary arrays
+BLOCK = 1 << 22
+
+_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    _CODES[ord(_base)] = _CODES[ord(_base.lower())] = _code
+_LETTERS = np.frombuffer(BASES.encode('ascii'), dtype=np.uint8)
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def _pack(codes: np.ndarray) -> np.ndarray:
+    """Pack 2-bit codes four to a byte, base i in bits 2*(i % 4); padding bits are zero."""
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+class PackedSequence:
+    """
+    Nucleotide sequence stored with 2 bits per base in a numpy uint8 array,
+    a quarter of the memory of the equivalent str. Only A, C, G and T
+    (either case) can be stored. Supports len, indexing, slicing, equality,
+    concatenation and repetition like str, so longest_substrand accepts it.
+    """
+
+    def __init__(self, data: np.ndarray, length: int):
+        self.data = data
+        self.length = length
+
+    @classmethod
+    def from_string(cls, sequence: Union[str, bytes]) -> 'PackedSequence':
+        if isinstance(sequence, str):
+            sequence = sequence.encode('ascii', errors='replace')
+        data = np.empty(-(-len(sequence) // 4), dtype=np.uint8)
+        for start in range(0, len(sequence), BLOCK):
+            codes = _CODES[np.frombuffer(sequence, dtype=np.uint8, count=min(BLOCK, len(sequence) - start),
+                                         offset=start)]
+            if (codes == 255).any():
+                position = start + int(np.argmax(codes == 255))
+                raise ValueError(f"Invalid base {chr(sequence[position])!r} at position {position}, "
+                                 f"expected one of {BASES}")
+            data[start // 4:start // 4 + -(-len(codes) // 4)] = _pack(codes)
+        return cls(data, len(sequence))
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray) -> 'PackedSequence':
+        """Pack an array of base codes (0-3 for A, C, G, T)."""
+        return cls(_pack(np.asarray(codes, dtype=np.uint8)), len(codes))
+
+    def codes(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Unpacked base codes of positions start to stop as a uint8 array."""
+        stop = self.length if stop is None else stop
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        data = self.data[start // 4:-(-stop // 4)]
+        codes = ((data[:, None] >> _SHIFTS) & 3).ravel()
+        return codes[start % 4:start % 4 + stop - start]
+
+    def __str__(self) -> str:
+        return ''.join(_LETTERS[self.codes(start, min(start + BLOCK, self.length))].tobytes().decode('ascii')
+                       for start in range(0, self.length, BLOCK))
+
+    def __repr__(self) -> str:
+        preview = str(self[:20]) + ('...' if self.length > 20 else '')
+        return f"PackedSequence({preview!r}, length={self.length})"
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return PackedSequence.from_codes(self.codes()[index])
+            stop = max(start, stop)
+            if start % 4 == 0:
+                # Byte aligned: copy the bytes and clear the bits past the end
+                data = self.data[start // 4:-(-stop // 4)].copy()
+                if (stop - start) % 4:
+                    data[-1] &= (1 << 2 * ((stop - start) % 4)) - 1
+                return PackedSequence(data, stop - start)
+            return PackedSequence.from_codes(self.codes(start, stop))
+
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("sequence index out of range")
+        return BASES[(self.data[index // 4] >> 2 * (index % 4)) & 3]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, str):
+            return len(other) == self.length and str(self) == other
+        if not isinstance(other, PackedSequence):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.data, other.data)
+
+    def __hash__(self) -> int:
+        return hash((self.length, self.data.tobytes()))
+
+    def __add__(self, other: 'PackedSequence') -> 'PackedSequence':
+        if self.length % 4 == 0:
+            return PackedSequence(np.concatenate((self.data, other.data)), self.length + other.length)
+        return PackedSequence.from_codes(np.concatenate((self.codes(), other.codes())))
+
+    def __mul__(self, times: int) -> 'PackedSequence':
+        times = max(times, 0)
+        if self.length % 4 == 0:
+            return PackedSequence(np.tile(self.data, times), self.length * times)
+        return PackedSequence.from_codes(np.tile(self.codes(), times))
+
+    def has_period(self, period: int) -> bool:
+        """True if base i equals base i - period for every i, compared blockwise with numpy."""
+        if period <= 0:
+            raise ValueError("period must be positive")
+        if period >= self.length:
+            return True
+        start = period
+        if period % 4 == 0:
+            # Byte aligned shift: compare whole bytes, then the partial last byte below
+            whole = (self.length - period) // 4
+            shift = period // 4
+            for offset in range(0, whole, BLOCK):
+                end = min(offset + BLOCK, whole)
+                if not np.array_equal(self.data[shift + offset:shift + end], self.data[offset:end]):
+                    return False
+            start = period + whole * 4
+        for offset in range(start, self.length, BLOCK):
+            end = min(offset + BLOCK, self.length)
+            if not np.array_equal(self.codes(offset, end), self.codes(offset - period, end - period)):
+                return False
+        return True
+
+    def is_repeat_of(self, unit_length: int) -> bool:
+        """True if the sequence is its prefix of unit_length repeated a whole number of times."""
+        return unit_length > 0 and self.length % unit_length == 0 and self.has_period(unit_length)
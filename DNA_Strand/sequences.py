@@ -0,0 +1,193 @@
+import gzip
+from typing import Iterator, List, Optional, Tuple
+
+# Characters read from a file at a time
+BLOCK_SIZE = 1 << 20
+# Records per chunk returned by RecordChunks
+CHUNK_RECORDS = 10_000
+
+
+def open_text(path: str):
+    """Open a plain or gzip compressed (.gz) sequence file as text."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _record_name(header: str) -> str:
+    # The identifier is the header up to the first whitespace
+    fields = header.split(maxsplit=1)
+    return fields[0] if fields else ''
+
+
+class RecordChunks:
+    """
+    Iterate over a FASTA or FASTQ file as raw text chunks of whole records,
+    without parsing them. Records are counted and cut with str.count and
+    str.split on large blocks, so the main process of a pipeline can hand
+    out work cheaply and leave the parsing to parse_chunk in the workers.
+    A FASTA chunk is a run of records each starting with '\\n>', a FASTQ
+    chunk a run of four-line records.
+    """
+
+    def __init__(self, path: str, records: int = CHUNK_RECORDS):
+        self.path = path
+        self.records = records
+        self.file = open_text(path)
+        first = self.file.read(BLOCK_SIZE)
+        self.format = 'fastq' if first.lstrip().startswith('@') else 'fasta'
+        if self.format == 'fasta':
+            # A newline in front makes the first header look like every other one
+            self.marker, self.per_record = '\n>', 1
+            first = '\n' + first
+        else:
+            self.marker, self.per_record = '\n', 4
+            first = first.lstrip()
+        self.parts = [first] if first else []
+        self.found = first.count(self.marker)
+        self.first_chunk = True
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def _read(self) -> bool:
+        block = self.file.read(BLOCK_SIZE)
+        if not block:
+            return False
+        # A two-character marker may be split between two blocks
+        if (len(self.marker) > 1 and self.parts and self.parts[-1].endswith(self.marker[0])
+                and block.startswith(self.marker[1:])):
+            self.found += 1
+        self.found += block.count(self.marker)
+        self.parts.append(block)
+        return True
+
+    def __next__(self) -> str:
+        # The chunk ends where record records + 1 starts, so one more marker is needed
+        wanted = self.records * self.per_record + (self.format == 'fasta')
+        while self.found < wanted and self._read():
+            pass
+        if not self.parts:
+            self.file.close()
+            raise StopIteration
+
+        text = ''.join(self.parts)
+        pieces = text.split(self.marker, wanted)
+        if self.first_chunk and self.format == 'fasta' and pieces[0].strip():
+            raise ValueError(f"{self.path}: sequence data before the first '>' header")
+        self.first_chunk = False
+
+        if len(pieces) > wanted:
+            cut = len(text) - len(pieces[-1]) - len(self.marker)
+            chunk, rest = text[:cut], text[cut:]
+            if self.format == 'fastq':
+                chunk, rest = chunk + '\n', rest[1:]
+        else:
+            chunk, rest = text, ''
+        self.parts = [rest] if rest else []
+        self.found = rest.count(self.marker)
+        if not chunk.strip():
+            self.file.close()
+            raise StopIteration
+        return chunk
+
+
+def parse_fasta_chunk(text: str) -> List[Tuple[str, str]]:
+    """(name, sequence) of every record in a FASTA chunk; sequences may be wrapped."""
+    records = []
+    for record in text.split('\n>')[1:]:
+        header, _, body = record.partition('\n')
+        records.append((_record_name(header), ''.join(body.split())))
+    return records
+
+
+def parse_fastq_chunk(text: str, path: str = '') -> List[Tuple[str, str, str]]:
+    """(name, sequence, quality) of every four-line record in a FASTQ chunk."""
+    lines = text.splitlines()
+    # Blank lines at the end of the file; an empty last quality line is kept
+    while len(lines) % 4 and not lines[-1].strip():
+        lines.pop()
+    if len(lines) % 4 == 3 and lines[-1].startswith('+'):
+        # Empty read at the very end: its empty quality line has no newline left
+        lines.append('')
+    if len(lines) % 4:
+        raise ValueError(f"{path}: truncated FASTQ record")
+    records = []
+    for i in range(0, len(lines), 4):
+        header, sequence, separator, quality = lines[i:i + 4]
+        sequence, quality = sequence.strip(), quality.strip()
+        if not header.startswith('@') or not separator.startswith('+') or len(quality) != len(sequence):
+            raise ValueError(f"{path}: malformed FASTQ record '{header.strip()}'")
+        records.append((_record_name(header[1:]), sequence, quality))
+    return records
+
+
+def parse_chunk(text: str, file_format: str) -> List[Tuple[str, str]]:
+    """(name, sequence) of every record in a chunk from RecordChunks."""
+    if file_format == 'fastq':
+        return [(name, sequence) for name, sequence, _ in parse_fastq_chunk(text)]
+    return parse_fasta_chunk(text)
+
+
+def read_fasta(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (name, sequence) for every record of a FASTA file, one chunk in memory at a time."""
+    for chunk in RecordChunks(path):
+        yield from parse_fasta_chunk(chunk)
+
+
+def read_fastq(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (name, sequence, quality) for every record of a FASTQ file."""
+    for chunk in RecordChunks(path):
+        yield from parse_fastq_chunk(chunk, path)
+
+
+def read_sequences(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (name, sequence) from a FASTA or FASTQ file, detected from its first record."""
+    chunks = RecordChunks(path)
+    for chunk in chunks:
+        yield from parse_chunk(chunk, chunks.format)
+
+
+def pair_chunks(path1: str, path2: Optional[str] = None,
+                pairs: int = CHUNK_RECORDS) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+    """
+    Raw chunks for up to pairs record pairs at a time, as (format1, text1,
+    format2, text2): record i of path1 is paired with record i of path2, or
+    with the next record of path1 when path2 is not given (text2 is then None).
+    """
+    if path2 is None:
+        chunks = RecordChunks(path1, 2 * pairs)
+        for chunk in chunks:
+            yield chunks.format, chunk, None, None
+        return
+
+    chunks1, chunks2 = RecordChunks(path1, pairs), RecordChunks(path2, pairs)
+    for chunk1 in chunks1:
+        chunk2 = next(chunks2, None)
+        if chunk2 is None:
+            raise ValueError(f"{path1} has more records than {path2}")
+        yield chunks1.format, chunk1, chunks2.format, chunk2
+    if next(chunks2, None) is not None:
+        raise ValueError(f"{path2} has more records than {path1}")
+
+
+def chunk_pairs(format1: str, text1: str, format2: Optional[str], text2: Optional[str]) -> List[Tuple[str, str, str, str]]:
+    """Parse a chunk from pair_chunks into (name1, sequence1, name2, sequence2) tuples."""
+    first = parse_chunk(text1, format1)
+    if text2 is None:
+        if len(first) % 2:
+            raise ValueError("odd number of records, the last one has no pair")
+        return [first[i] + first[i + 1] for i in range(0, len(first), 2)]
+    second = parse_chunk(text2, format2)
+    if len(first) != len(second):
+        raise ValueError("the two files have a different number of records")
+    return [record1 + record2 for record1, record2 in zip(first, second)]
+
+
+def iter_pairs(path1: str, path2: Optional[str] = None) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Yield (name1, sequence1, name2, sequence2): record i of path1 with record
+    i of path2, or consecutive records of path1 when path2 is not given.
+    """
+    for chunk in pair_chunks(path1, path2):
+        yield from chunk_pairs(*chunk)
@@ -0,0 +1,176 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Anchors examined per step by tandem_repeats, bounding temporary arrays
+ANCHOR_BATCH = 1 << 21
+# lce first compares 2**LCE_SHORT_LEVEL bases, and pairs differing there skip the upper levels
+LCE_SHORT_LEVEL = 3
+_LETTER_CODES = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+
+class TandemRepeat(NamedTuple):
+    """sequence[start:end] repeats its first period bases at least twice and cannot be extended."""
+    start: int
+    end: int
+    period: int
+
+    @property
+    def copies(self) -> float:
+        return (self.end - self.start) / self.period
+
+
+def sequence_codes(sequence) -> np.ndarray:
+    """Character codes of a str or packed.PackedSequence, comparable between the two."""
+    if isinstance(sequence, str):
+        return np.frombuffer(sequence.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    if hasattr(sequence, 'codes'):
+        return _LETTER_CODES[sequence.codes()].astype(np.int64)
+    return np.asarray(sequence, dtype=np.int64)
+
+
+def _sorted_ranks(key: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Order of the keys and the dense rank of each, equal keys sharing a rank (so any sort will do)
+    order = np.argsort(key)
+    sorted_key = key[order]
+    rank = np.empty(len(key), dtype=np.int64)
+    rank[order] = np.cumsum(np.concatenate(([0], sorted_key[1:] != sorted_key[:-1])))
+    return order, rank
+
+
+class SuffixArray:
+    """
+    Suffix array of a sequence built by prefix doubling with numpy sorts, in
+    O(n log n). The ranks of every doubling step are kept: levels[k][i] ==
+    levels[k][j] exactly when the 2**k bases starting at i and j are equal,
+    so the longest common extension of many position pairs is found in one
+    vectorized pass per level.
+    """
+
+    def __init__(self, sequence):
+        self.codes = sequence_codes(sequence)
+        n = len(self.codes)
+        self.order, rank = _sorted_ranks(self.codes)
+        self.levels = [rank.astype(np.int32)]
+        step = 1
+        while n and rank.max() < n - 1:
+            # Sort by (rank of the first half, rank of the second half); -1 past the end
+            second = np.full(n, -1, dtype=np.int64)
+            second[:n - step] = rank[step:]
+            self.order, rank = _sorted_ranks(rank * (n + 1) + second + 1)
+            self.levels.append(rank.astype(np.int32))
+            step *= 2
+        self.rank = rank
+        self._lcp = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def lce(self, i, j) -> np.ndarray:
+        """Length of the longest common prefix of the suffixes at i and j, elementwise; i != j."""
+        i, j = np.asarray(i, dtype=np.int64), np.asarray(j, dtype=np.int64)
+        i, j = np.broadcast_arrays(i, j)
+        # All ranks of the last level differ, so a common prefix is shorter than 2**(levels - 1)
+        top = len(self.levels) - 2
+        # Most pairs differ within a few bases: only those sharing 2**short bases need the upper levels
+        short = min(LCE_SHORT_LEVEL, top)
+        if short <= 0:
+            return self._extend(i, j, top)
+        length = np.empty(i.shape, dtype=np.int64)
+        long = self._equal(self.levels[short], i, j)
+        length[long] = self._extend(i[long], j[long], top)
+        length[~long] = self._extend(i[~long], j[~long], short - 1)
+        return length
+
+    def _equal(self, ranks: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        n = len(self.codes)
+        match = (a < n) & (b < n)
+        match[match] = ranks[a[match]] == ranks[b[match]]
+        return match
+
+    def _extend(self, i: np.ndarray, j: np.ndarray, top: int) -> np.ndarray:
+        # Greedy from level top down: each level matched adds 2**level bases
+        length = np.zeros(i.shape, dtype=np.int64)
+        for level in range(top, -1, -1):
+            length += self._equal(self.levels[level], i + length, j + length).astype(np.int64) << level
+        return length
+
+    @property
+    def lcp(self) -> np.ndarray:
+        """lcp[r] is the common prefix length of the suffixes ranked r - 1 and r (lcp[0] is 0)."""
+        if self._lcp is None:
+            self._lcp = np.concatenate(([0], self.lce(self.order[:-1], self.order[1:]))) if len(self) else self.order
+        return self._lcp
+
+
+def common_substring_span(str1, str2) -> Tuple[int, int, int]:
+    """
+    (start1, start2, length) of a longest common substring of str1 and str2,
+    from the suffix array of str1 + separator + str2: it is the longest
+    common prefix of two neighbouring suffixes that come from different
+    strands. length is 0 when they share no base.
+    """
+    codes1, codes2 = sequence_codes(str1), sequence_codes(str2)
+    if not len(codes1) or not len(codes2):
+        return 0, 0, 0
+    # A separator no strand contains stops every common prefix at the end of str1
+    separator = max(codes1.max(), codes2.max()) + 1
+    index = SuffixArray(np.concatenate((codes1, [separator], codes2)))
+    in_first = index.order < len(codes1)
+    mixed = np.flatnonzero(in_first[1:] != in_first[:-1]) + 1
+    best = mixed[np.argmax(index.lcp[mixed])]
+    length = int(index.lcp[best])
+    if not length:
+        return 0, 0, 0
+    first, second = sorted(index.order[best - 1:best + 1].tolist())
+    return first, second - len(codes1) - 1, length
+
+
+def longest_common_substring(str1, str2):
+    """Longest substring of both strands (str or PackedSequence), None if they share no base."""
+    start1, _, length = common_substring_span(str1, str2)
+    return str1[start1:start1 + length] if length else None
+
+
+def tandem_repeats(sequence, min_length: int = 2, index: Optional[SuffixArray] = None) -> List[TandemRepeat]:
+    """
+    All maximal tandem repeats (runs) of a strand, each with its smallest
+    period, sorted by start. For every period p, the anchors q = p, 2p, ...
+    are extended forwards (common extension of q and q + p) and backwards
+    (on the reversed strand); a run of period p contains an anchor, so the
+    O(n log n) anchors find every run. index may be a SuffixArray of the
+    strand built earlier.
+    """
+    forward = index or SuffixArray(sequence)
+    n = len(forward)
+    if n < 2:
+        return []
+    backward = SuffixArray(forward.codes[::-1])
+
+    found = []
+    periods = np.arange(1, n // 2 + 1)
+    anchors = n // periods - 1
+    first = 0
+    while first < len(periods):
+        # Periods whose anchors fit in one batch
+        last = max(first + 1, int(np.searchsorted(np.cumsum(anchors[first:]), ANCHOR_BATCH)) + first)
+        counts = anchors[first:last]
+        period = np.repeat(periods[first:last], counts)
+        multiple = np.arange(len(period)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        anchor = period * multiple
+        ahead = forward.lce(anchor, anchor + period)
+        # Position q - 1 of the strand is n - q of the reversed one
+        behind = backward.lce(n - anchor, n - anchor - period)
+        run = ahead + behind >= period
+        start, end, period = anchor[run] - behind[run], anchor[run] + period[run] + ahead[run], period[run]
+        # Consecutive anchors of one run find it again
+        keep = np.unique(np.stack((start, end, period), axis=1), axis=0)
+        found.append(keep)
+        first = last
+
+    runs = np.concatenate(found)
+    # A run also found with a multiple of its period is kept once, with the smallest
+    runs = runs[np.lexsort((runs[:, 2], runs[:, 1], runs[:, 0]))]
+    first_of_span = np.concatenate(([True], (runs[1:, :2] != runs[:-1, :2]).any(axis=1)))
+    runs = runs[first_of_span & (runs[:, 1] - runs[:, 0] >= min_length)]
+    return [TandemRepeat(*run) for run in runs.tolist()]
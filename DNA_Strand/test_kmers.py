@@ -0,0 +1,37 @@
+import random
+
+import kmers
+from kmers import KmerIndex
+
+
+def random_strand(length, seed):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+def test_short_strand_with_minimizers():
+    # Fewer k-mers than one minimizer window
+    index = KmerIndex.build(['ACG'], k=21, window=10)
+    assert len(index) == 1
+    assert len(index.hashes) == 0
+    assert index.shared_kmers('ACG') == []
+
+
+def test_short_strands_next_to_long_ones(monkeypatch):
+    long_strand = random_strand(300, seed=1)
+    expected = KmerIndex.build([long_strand], k=15, window=8)
+    # One strand per chunk, so some chunks hold only a short strand
+    monkeypatch.setattr(kmers, 'BUILD_CHUNK', 1)
+    index = KmerIndex.build(['ACG', long_strand, 'A', ''], k=15, window=8)
+    assert len(index) == 4
+    assert index.hashes.tolist() == expected.hashes.tolist()
+    assert set(index.strands.tolist()) == {1}
+    assert index.shared_kmers(long_strand) == [(1, len(index.sample(long_strand)))]
+
+
+def test_strands_without_valid_kmers():
+    for window in (1, 4):
+        index = KmerIndex.build(['AC', 'N' * 40], k=21, window=window)
+        assert len(index) == 2
+        assert len(index.hashes) == 0
+        assert index.shared_kmers('N' * 40) == []
@@ -0,0 +1,202 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+HEADER = ["Genere", "Nome", "Cognome", "Età", "Email"]
+CLEAN_GENDERS = ["Male", "Female"]
+NOISY_GENDERS = ["male", "FEMALE", " Female", "Male ", "M", "F", "Other", "Non-Binary", "Maschio", ""]
+
+# name -> (module, call, output files as (male, female, unrecognized))
+IMPLEMENTATIONS = {
+    "csv": ("test1", lambda m, path: m.process_genders(path),
+            ("male.csv", "female.csv", "sconosciuti.csv")),
+    "csv-stream": ("test1", lambda m, path: m.process_genders(path, stream=True),
+                   ("male.csv", "female.csv", "sconosciuti.csv")),
+    "parallel": ("test4", lambda m, path: m.process_genders_parallel(path),
+                 ("male.csv", "female.csv", "sconosciuti.csv")),
+    "pandas": ("test2_modified", lambda m, path: m.process_genders(path, ["Male", "Female"]),
+               ("male_pandas.csv", "female_pandas.csv", "sconosciuti_pandas.csv")),
+    "pandas-chunked": ("test2_modified", lambda m, path: m.process_genders_chunked(path, ["Male", "Female"]),
+                       ("male_pandas.csv", "female_pandas.csv", "sconosciuti_pandas.csv")),
+    "dask": ("test3_modified", lambda m, path: m.process_large_csv(path),
+             ("male.csv", "female.csv", "unknown.csv")),
+}
+DEFAULT_IMPLEMENTATIONS = ["csv", "pandas", "dask"]
+
+
+def generate_csv(path, rows, duplicate_rate=0.05, noise=0.2, seed=0):
+    """
+    Write a synthetic employee CSV with the same columns as test_data.csv.
+    duplicate_rate is the share of rows that repeat an earlier row exactly,
+    noise the share of rows whose Genere is not a clean "Male"/"Female".
+    """
+    rng = random.Random(seed)
+    recent = []
+    with open(path, "w", newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            if recent and rng.random() < duplicate_rate:
+                row = rng.choice(recent)
+            else:
+                gender = rng.choice(NOISY_GENDERS) if rng.random() < noise else rng.choice(CLEAN_GENDERS)
+                row = [gender, f"Name{i}", f"Surname{i % 1000}", rng.randint(20, 65), f"user{i}@example.com"]
+                if len(recent) < 1000:
+                    recent.append(row)
+                else:
+                    recent[rng.randrange(1000)] = row
+            writer.writerow(row)
+
+
+def output_fingerprint(output_files):
+    """
+    Order-independent fingerprint of the three outputs. Genere is normalized
+    so the pandas outputs (which rewrite it) compare equal to the others.
+    """
+    fingerprint = []
+    for output_file in output_files:
+        total, count = 0, 0
+        with open(output_file, newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for row in reader:
+                if row:
+                    row[0] = row[0].strip().capitalize()
+                digest = hashlib.blake2b("\x1f".join(row).encode('utf-8'), digest_size=8).digest()
+                total = (total + int.from_bytes(digest, "little")) % (1 << 64)
+                count += 1
+        fingerprint.append([count, f"{total:016x}"])
+    return fingerprint
+
+
+def _peak_rss_mb():
+    import resource
+    # Worker processes (test4) are included through RUSAGE_CHILDREN
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_one(name, path, workdir, queue):
+    """Run one implementation in a fresh process and report time, memory and outputs."""
+    try:
+        import importlib
+        module_name, call, output_files = IMPLEMENTATIONS[name]
+        module = importlib.import_module(module_name)
+        logging.getLogger().setLevel(logging.WARNING)
+        os.chdir(workdir)
+        start = time.perf_counter()
+        call(module, path)
+        elapsed = time.perf_counter() - start
+        queue.put({"status": "ok", "seconds": elapsed, "peak_rss_mb": _peak_rss_mb(),
+                   "fingerprint": output_fingerprint(output_files)})
+    except ImportError as e:
+        queue.put({"status": "skipped", "error": str(e)})
+    except Exception as e:
+        queue.put({"status": "failed", "error": str(e)})
+
+
+def run_implementation(name, path, timeout):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        process = ctx.Process(target=_run_one, args=(name, path, workdir, queue))
+        process.start()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+            return {"status": "timeout"}
+        if queue.empty():
+            return {"status": "failed", "error": f"exit code {process.exitcode}"}
+        return queue.get()
+
+
+def find_crossovers(results, implementations, metric):
+    """Sizes at which the best implementation for a metric changes."""
+    crossovers = []
+    previous = None
+    for size in sorted(results):
+        runs = {name: run for name, run in results[size].items()
+                if name in implementations and run["status"] == "ok"}
+        if not runs:
+            continue
+        best = min(runs, key=lambda name: runs[name][metric])
+        if previous is not None and best != previous[1]:
+            crossovers.append({"metric": metric, "from": previous[1], "to": best,
+                               "between_rows": [previous[0], size]})
+        previous = (size, best)
+    return crossovers
+
+
+def run_benchmarks(sizes, implementations, duplicate_rate, noise, timeout, data_dir, report_path):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+
+    results = {}
+    os.makedirs(data_dir, exist_ok=True)
+    for rows in sizes:
+        path = os.path.abspath(os.path.join(data_dir, f"employees_{rows}_{duplicate_rate}_{noise}.csv"))
+        if not os.path.exists(path):
+            generate_csv(path, rows, duplicate_rate, noise)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"\n{rows} rows, {size_mb:.1f} MB")
+
+        results[rows] = {}
+        reference = None
+        for name in implementations:
+            run = run_implementation(name, path, timeout)
+            if run["status"] == "ok":
+                run["rows_per_second"] = rows / run["seconds"]
+                run["mb_per_second"] = size_mb / run["seconds"]
+                reference = reference or run["fingerprint"]
+                run["equivalent"] = run["fingerprint"] == reference
+                print(f"{name:>15}: {run['seconds']:8.2f} s  {run['rows_per_second']:12,.0f} rows/s  "
+                      f"{run['peak_rss_mb']:8.1f} MB peak  {'ok' if run['equivalent'] else 'MISMATCH'}")
+            else:
+                print(f"{name:>15}: {run['status']} {run.get('error', '')}")
+            results[rows][name] = run
+
+    report = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "parameters": {"sizes": sizes, "duplicate_rate": duplicate_rate, "noise": noise, "timeout": timeout},
+        "results": {str(rows): runs for rows, runs in results.items()},
+        "crossovers": (find_crossovers(results, implementations, "seconds")
+                       + find_crossovers(results, implementations, "peak_rss_mb")),
+    }
+    with open(report_path, "w", encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nReport written to {report_path}")
+    for crossover in report["crossovers"]:
+        print(f"{crossover['metric']}: {crossover['from']} -> {crossover['to']} "
+              f"between {crossover['between_rows'][0]} and {crossover['between_rows'][1]} rows")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the gender splitters at scale")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma separated row counts, e.g. 1e4,1e5,1e6,1e7,1e8")
+    parser.add_argument("--implementations", default=",".join(DEFAULT_IMPLEMENTATIONS),
+                        help=f"comma separated subset of {', '.join(IMPLEMENTATIONS)}")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--noise", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds per run")
+    parser.add_argument("--data-dir", default="bench_data")
+    parser.add_argument("--report", default="benchmark_report.json")
+    args = parser.parse_args()
+    run_benchmarks([int(float(size)) for size in args.sizes.split(",")],
+                   args.implementations.split(","), args.duplicate_rate, args.noise,
+                   args.timeout, args.data_dir, args.report)
@@ -0,0 +1,64 @@
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+COMPRESSION = "zstd"
+
+
+def output_path(output_file, output_format):
+    """Swap the .csv extension of an output file for the columnar format."""
+    if output_format == "csv":
+        return output_file
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return os.path.splitext(output_file)[0] + f".{output_format}"
+
+
+def reset_output(path):
+    """Remove the result of a previous run so no stale partitions are left behind."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_columnar(df, path, output_format, partition_col="Genere", basename="part"):
+    """
+    Write a DataFrame as a compressed columnar output.
+    Parquet outputs are hive-partitioned datasets on partition_col and can be
+    written in several calls with different basenames; Feather has no
+    partitioning and is written as a single file.
+    """
+    # Missing partition values become '' so every partition reads back as a string;
+    # the cast comes first because a categorical column cannot take a new '' value
+    df = df.assign(**{partition_col: df[partition_col].astype("string").fillna("")})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    if output_format == "parquet":
+        os.makedirs(path, exist_ok=True)
+        pq.write_to_dataset(table, path, partition_cols=[partition_col], compression=COMPRESSION,
+                            basename_template=f"{basename}-{{i}}.parquet",
+                            existing_data_behavior="overwrite_or_ignore")
+    elif output_format == "feather":
+        feather.write_feather(table, path, compression=COMPRESSION)
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+
+def concat_feather(part_paths, path):
+    """Stream several Feather part files into a single Feather file."""
+    # Parts whose columns are entirely empty carry a null type, so the
+    # schemas are unified before the tables are appended
+    schemas = []
+    for part_path in part_paths:
+        with pa.memory_map(part_path) as source:
+            schemas.append(pa.ipc.open_file(source).schema)
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+
+    with pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression=COMPRESSION)) as writer:
+        for part_path in part_paths:
+            writer.write_table(feather.read_table(part_path, memory_map=True).cast(schema))
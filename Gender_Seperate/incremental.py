@@ -0,0 +1,317 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import defaultdict
+
+from rules import ClassificationRules, MissingValueError
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.bin"
+# Renames of a run that is being committed, replayed if the run was interrupted
+JOURNAL_FILE = "pending.json"
+# Sidecar index record: 16-byte row digest + 8-byte key digest + 1-byte bucket id
+DIGEST_SIZE = 16
+KEY_SIZE = 8
+RECORD_SIZE = DIGEST_SIZE + KEY_SIZE + 1
+NO_KEY = bytes(KEY_SIZE)
+# Target rows per output shard: a run rewrites every shard that holds a
+# changed row, so small shards keep the rewritten share close to the churn
+ROWS_PER_SHARD = 16
+# Reshard when the row count moves this many times away from the shard size
+SHARD_DRIFT = 4
+
+
+def _row_digest(values):
+    # Missing fields are written back as '', so they hash as '' as well
+    text = repr(tuple("" if value is None else value for value in values))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def _key_digest(value):
+    return hashlib.blake2b(str(value).encode('utf-8'), digest_size=KEY_SIZE).digest()
+
+
+def _shard(digest, shards):
+    return int.from_bytes(digest[:4], "little") % shards
+
+
+def _fingerprint(csv_file):
+    stat = os.stat(csv_file)
+    return {"path": os.path.abspath(csv_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _write_tmp(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    return tmp_path
+
+
+def _replace_atomic(path, write):
+    os.replace(_write_tmp(path, write), path)
+
+
+def _commit(output_dir, replaced, removed):
+    """
+    Publish the staged files of a run together: the journal lists every
+    rename and removal, so a run interrupted halfway is completed by the
+    next one and shards, index and manifest never disagree.
+    """
+    journal = {"replace": [os.path.relpath(path, output_dir) for path in replaced],
+               "remove": [os.path.relpath(path, output_dir) for path in removed]}
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding='utf-8') as file:
+            json.dump(journal, file)
+    _replace_atomic(os.path.join(output_dir, JOURNAL_FILE), write)
+    _replay_journal(output_dir)
+
+
+def _replay_journal(output_dir):
+    journal_path = os.path.join(output_dir, JOURNAL_FILE)
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, encoding='utf-8') as file:
+        journal = json.load(file)
+    # Every step can be repeated, a missing temp file means it was already renamed
+    for path in journal["replace"]:
+        path = os.path.join(output_dir, path)
+        if os.path.exists(path + ".tmp"):
+            os.replace(path + ".tmp", path)
+    for path in journal["remove"]:
+        path = os.path.join(output_dir, path)
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(journal_path)
+
+
+def load_index(path):
+    """Read the sidecar index into {row digest: (key digest, bucket id)}."""
+    index = {}
+    with open(path, "rb") as file:
+        data = file.read()
+    for offset in range(0, len(data), RECORD_SIZE):
+        record = data[offset:offset + RECORD_SIZE]
+        index[record[:DIGEST_SIZE]] = (record[DIGEST_SIZE:-1], record[-1])
+    return index
+
+
+def _index_writer(index):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as file:
+            for digest in sorted(index):
+                key, bucket_id = index[digest]
+                file.write(digest + key + bytes((bucket_id,)))
+    return write
+
+
+def save_index(path, index):
+    _replace_atomic(path, _index_writer(index))
+
+
+def _shard_path(output_dir, output_file, shard):
+    return os.path.join(output_dir, os.path.splitext(output_file)[0], f"part-{shard:03d}.csv")
+
+
+def _stage_shard(path, fieldnames, removed, added_rows):
+    """
+    Write the new version of one output partition (removed rows dropped,
+    added rows appended) next to it as a temp file. Returns True if the
+    partition is to be replaced, False if it is to be deleted.
+    """
+    rows = []
+    if removed and os.path.exists(path):
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = [row for row in csv.DictReader(file) if _row_digest(row.values()) not in removed]
+    elif os.path.exists(path):
+        # Nothing removed from this partition: copy it and append the new rows
+        def append(tmp_path):
+            shutil.copyfile(path, tmp_path)
+            with open(tmp_path, "a", newline='', encoding='utf-8') as file:
+                csv.DictWriter(file, fieldnames=fieldnames).writerows(added_rows)
+        _write_tmp(path, append)
+        return True
+
+    rows.extend(added_rows)
+    if not rows:
+        return False
+
+    def write(tmp_path):
+        with open(tmp_path, "w", newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_tmp(path, write)
+    return True
+
+
+def _shard_count(rows, buckets):
+    """Shards per output so that a shard holds about ROWS_PER_SHARD rows."""
+    return max(1, -(-rows // (ROWS_PER_SHARD * buckets)))
+
+
+def _read_rows(csv_file, rules, buckets, key_column, previous):
+    """
+    Hash every row of the input. Returns {row digest: (key digest, bucket id)}
+    for all rows and (bucket id, row digest, row) for those not in previous.
+    """
+    current = {}
+    added = []
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file, delimiter=",")
+        for row in reader:
+            try:
+                if None in row:
+                    raise ValueError("row has more fields than the header")
+                bucket_id = buckets.index(rules.classify(row[rules.column]))
+                digest = _row_digest(row.values())
+                if digest in current:
+                    continue
+                current[digest] = (_key_digest(row[key_column]) if key_column else NO_KEY, bucket_id)
+                if digest not in previous:
+                    added.append((bucket_id, digest, row))
+            except MissingValueError as e:
+                logging.error(f"Skipping row: {e}")
+            except KeyError as e:
+                logging.error(f"KeyError: Missing key in row: {e}")
+            except Exception as e:
+                logging.error(f"Error processing row: {e}")
+    return current, added
+
+
+def process_genders_incremental(csv_file, output_dir="split", key_column=None, shards=None, rules=None):
+    """
+    Incremental version of the gender split for inputs that change little
+    between runs. Each output is split into hash shards under output_dir and
+    a sidecar index keeps one compact record per row of the previous run.
+    New, removed and (with key_column) changed rows are detected from the
+    index and only the shards that contain them are rewritten. A manifest
+    records the input fingerprint, the header, the counts and the last delta.
+    Rewritten shards, index and manifest are staged as temp files and
+    renamed together at the end of the run.
+
+    Without shards the shard count is sized from the number of rows, about
+    ROWS_PER_SHARD rows per shard, so a small change touches few shards.
+    The outputs are rebuilt when the row count drifts more than SHARD_DRIFT
+    times away from that size.
+    """
+    rules = rules or ClassificationRules.for_genders(["Male", "Female"])
+    output_files = rules.output_files()
+    buckets = list(output_files)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+
+    try:
+        fingerprint = _fingerprint(csv_file)
+        # Finish the commit of an interrupted run before looking at its state
+        _replay_journal(output_dir)
+        manifest = None
+        if os.path.exists(manifest_path) and os.path.exists(index_path):
+            with open(manifest_path, encoding='utf-8') as file:
+                manifest = json.load(file)
+        with open(csv_file, newline='', encoding='utf-8') as file:
+            fieldnames = csv.DictReader(file, delimiter=",").fieldnames
+        # A different header makes the existing shards unusable: rebuild everything
+        settings = {"outputs": output_files, "shards": shards, "key_column": key_column,
+                    "fieldnames": fieldnames}
+        full = manifest is None or manifest["settings"] != settings or "shard_count" not in manifest
+
+        if not full and manifest["input"] == fingerprint:
+            logging.info(f"{csv_file} unchanged since the last run, nothing to do")
+            _log_counts(rules, manifest["counts"])
+            return
+
+        previous = {} if full else load_index(index_path)
+        current, added_rows = _read_rows(csv_file, rules, buckets, key_column, previous)
+
+        if full:
+            shard_count = shards or _shard_count(len(current), len(buckets))
+        else:
+            shard_count = manifest["shard_count"]
+            if shards is None:
+                ideal = _shard_count(len(current), len(buckets))
+                if not shard_count / SHARD_DRIFT <= ideal <= shard_count * SHARD_DRIFT:
+                    # The input grew or shrank too much for the current shards: rebuild,
+                    # which needs every row again and not only the new ones
+                    logging.info(f"Resharding from {shard_count} to {ideal} shards per output")
+                    full, previous, shard_count = True, {}, ideal
+                    current, added_rows = _read_rows(csv_file, rules, buckets, key_column, previous)
+
+        # With key_column rows are sharded by key, so the old and the new
+        # version of a changed row sit in the same shard
+        added = defaultdict(list)
+        for bucket_id, digest, row in added_rows:
+            added[(bucket_id, _shard(current[digest][0] if key_column else digest, shard_count))].append(row)
+        removed = defaultdict(set)
+        removed_keys = set()
+        for digest in previous.keys() - current.keys():
+            key, bucket_id = previous[digest]
+            removed[(bucket_id, _shard(key if key_column else digest, shard_count))].add(digest)
+            removed_keys.add(key)
+        added_count = len(added_rows)
+        removed_count = sum(len(digests) for digests in removed.values())
+        changed_count = 0
+        if key_column:
+            added_keys = {_key_digest(row[key_column]) for _, _, row in added_rows}
+            changed_count = len(added_keys & removed_keys)
+
+        if full:
+            for output_file in output_files.values():
+                shutil.rmtree(os.path.join(output_dir, os.path.splitext(output_file)[0]), ignore_errors=True)
+        os.makedirs(output_dir, exist_ok=True)
+
+        affected = set(added) | set(removed)
+        replaced, deleted = [], []
+        for bucket_id, shard in sorted(affected):
+            path = _shard_path(output_dir, output_files[buckets[bucket_id]], shard)
+            if _stage_shard(path, fieldnames, removed.get((bucket_id, shard)), added.get((bucket_id, shard), [])):
+                replaced.append(path)
+            elif os.path.exists(path):
+                deleted.append(path)
+
+        counts = {bucket: 0 for bucket in buckets}
+        for _, bucket_id in current.values():
+            counts[buckets[bucket_id]] += 1
+
+        _write_tmp(index_path, _index_writer(current))
+        manifest = {
+            "input": fingerprint,
+            "settings": settings,
+            "shard_count": shard_count,
+            "counts": counts,
+            "last_run": {"full": full, "added": added_count, "removed": removed_count,
+                         "changed": changed_count, "rewritten_partitions": len(affected)},
+        }
+
+        def write_manifest(tmp_path):
+            with open(tmp_path, "w", encoding='utf-8') as file:
+                json.dump(manifest, file, indent=2)
+        _write_tmp(manifest_path, write_manifest)
+        _commit(output_dir, replaced + [index_path, manifest_path], deleted)
+
+        logging.info(f"Added {added_count}, removed {removed_count}, changed {changed_count} rows; "
+                     f"rewritten {len(affected)} of {len(buckets) * shard_count} partitions")
+        _log_counts(rules, counts)
+
+    except FileNotFoundError as e:
+        logging.error(f"FileNotFoundError: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+
+
+def _log_counts(rules, counts):
+    for bucket in rules.buckets:
+        logging.info(f"{bucket} count: {counts[bucket]}")
+
+    logging.info(f"Unrecognized count: {counts[rules.default]}")
+
+
+if __name__ == "__main__":
+    # Specify the CSV file in the current directory
+    csv_file = "./test_data.csv"  # Replace with your actual filename
+    process_genders_incremental(csv_file, key_column="Email")
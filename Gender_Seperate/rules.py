@@ -0,0 +1,126 @@
+import csv
+from collections import OrderedDict
+
+# Example synonym table, pass it to ClassificationRules to map abbreviations
+# and Italian terms as well
+GENDER_SYNONYMS = {
+    "Male": ["M", "uomo", "maschio"],
+    "Female": ["F", "donna", "femmina"],
+}
+
+# Distinct raw values cached by ClassificationRules.classify; values seen after
+# the cache is full are normalized on every lookup
+CACHE_SIZE = 65536
+
+
+class MissingValueError(ValueError):
+    """Raised when a row has no value in the rule column, e.g. a short CSV row."""
+
+
+class ClassificationRules:
+    """
+    Compiled rule table that maps raw column values to output buckets.
+
+    Every synonym is normalized once (strip + casefold) when the table is
+    built. Raw values are normalized the first time they are seen and then
+    cached, so classifying a row is a single dictionary lookup. At most
+    CACHE_SIZE raw values are cached, so a column with many distinct values
+    does not grow the table without bound.
+    """
+
+    def __init__(self, column, synonyms, default="sconosciuti", file_pattern="{bucket}.csv"):
+        self.column = column
+        self.buckets = list(synonyms)
+        self.default = default
+        self.file_pattern = file_pattern
+        self._keys = {}
+        for bucket, values in synonyms.items():
+            for value in [bucket, *values]:
+                self._keys[value.strip().casefold()] = bucket
+        self._table = {}
+
+    @classmethod
+    def for_genders(cls, genders_to_count, column="Genere", default="sconosciuti", file_pattern="{bucket}.csv"):
+        """Rules equivalent to the original strip().capitalize() comparison."""
+        return cls(column, {gender: [] for gender in genders_to_count}, default, file_pattern)
+
+    def classify(self, value):
+        try:
+            return self._table[value]
+        except KeyError:
+            # csv.DictReader fills the missing fields of a short row with None
+            if not isinstance(value, str):
+                raise MissingValueError(f"no value for {self.column}") from None
+            bucket = self._keys.get(value.strip().casefold(), self.default)
+            if len(self._table) < CACHE_SIZE:
+                self._table[value] = bucket
+            return bucket
+
+    def classify_values(self, values):
+        """Classify a pandas Series through its unique values only."""
+        import numpy as np
+        import pandas as pd
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Categorical columns already carry their unique values and codes
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        # Missing values have code -1, which picks the trailing default label
+        labels = np.array([self.classify(value) for value in uniques] + [self.default], dtype=object)
+        return labels[codes]
+
+    def output_file(self, bucket):
+        return self.file_pattern.format(bucket=bucket.lower())
+
+    def output_files(self):
+        return {bucket: self.output_file(bucket) for bucket in self.buckets + [self.default]}
+
+
+class WriterPool:
+    """
+    Keeps at most max_open output files open at a time. The least recently
+    used file is closed when the limit is reached and reopened in append mode
+    when needed again; the header is written only when a file is created.
+    """
+
+    def __init__(self, fieldnames, max_open=64, lineterminator="\r\n"):
+        self.fieldnames = fieldnames
+        self.lineterminator = lineterminator
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._created = set()
+
+    def file(self, path):
+        return self._get(path)[0]
+
+    def writer(self, path):
+        return self._get(path)[1]
+
+    def _get(self, path):
+        entry = self._open.get(path)
+        if entry is not None:
+            self._open.move_to_end(path)
+            return entry
+        if len(self._open) >= self.max_open:
+            _, (old, _) = self._open.popitem(last=False)
+            old.close()
+        mode = "a" if path in self._created else "w"
+        file = open(path, mode, newline='', encoding='utf-8')
+        writer = csv.DictWriter(file, fieldnames=self.fieldnames, lineterminator=self.lineterminator)
+        if path not in self._created:
+            writer.writeheader()
+            self._created.add(path)
+        entry = self._open[path] = (file, writer)
+        return entry
+
+    def ensure(self, paths):
+        """Create header-only files for outputs that received no rows."""
+        for path in paths:
+            if path not in self._created:
+                self.file(path)
+
+    def close(self):
+        for file, _ in self._open.values():
+            file.close()
+        self._open.clear()
@@ -1,12 +1,131 @@
 import csv
+import hashlib
 import logging
+import sqlite3
+
+from rules import ClassificationRules, MissingValueError, WriterPool
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-def process_genders(csv_file):
-    genders_to_count = ["Male", "Female"]
-    recognized_data = {gender: [] for gender in genders_to_count}
-    unrecognized_data = []
+
+class RowDeduplicator:
+    """
+    Remembers rows already seen through a 16-byte digest per row instead of
+    the full tuple. When spill_path is given, digests are moved to an sqlite
+    file once max_in_memory is reached, so memory stays bounded on multi-GB files.
+    """
+
+    def __init__(self, spill_path=None, max_in_memory=1_000_000):
+        self.spill_path = spill_path
+        self.max_in_memory = max_in_memory
+        self._memory = set()
+        self._db = None
+
+    @staticmethod
+    def digest(values):
+        # repr keeps empty strings, None and embedded commas distinguishable
+        return hashlib.blake2b(repr(tuple(values)).encode('utf-8'), digest_size=16).digest()
+
+    def seen(self, values):
+        """Return True if the row was already seen, otherwise record it."""
+        key = self.digest(values)
+        if key in self._memory:
+            return True
+        if self._db is not None and self._db.execute(
+                "SELECT 1 FROM seen WHERE digest = ?", (key,)).fetchone():
+            return True
+        self._memory.add(key)
+        if self.spill_path is not None and len(self._memory) >= self.max_in_memory:
+            self._spill()
+        return False
+
+    def _spill(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.spill_path)
+            self._db.execute("PRAGMA journal_mode = OFF")
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute("DROP TABLE IF EXISTS seen")
+            self._db.execute("CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((k,) for k in self._memory))
+        self._db.commit()
+        self._memory.clear()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def process_genders_stream(csv_file, spill_path=None, max_in_memory=1_000_000, rules=None):
+    """
+    Streaming variant of process_genders: all output writers are opened up
+    front and every row is routed as soon as it is read, deduplicated with
+    RowDeduplicator. Memory does not grow with the input file.
+    """
+    rules = rules or ClassificationRules.for_genders(["Male", "Female"])
+    output_files = rules.output_files()
+    counts = {bucket: 0 for bucket in output_files}
+    dedup = RowDeduplicator(spill_path, max_in_memory)
+    pool = None
+
+    try:
+        with open(csv_file, newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file, delimiter=",")
+
+            # Open every writer before reading the rows
+            pool = WriterPool(reader.fieldnames)
+            pool.ensure(output_files.values())
+
+            for row in reader:
+                try:
+                    bucket = rules.classify(row[rules.column])
+                    if dedup.seen(row.values()):
+                        continue
+                    pool.writer(output_files[bucket]).writerow(row)
+                    counts[bucket] += 1
+                except MissingValueError as e:
+                    logging.error(f"Skipping row: {e}")
+                except KeyError as e:
+                    logging.error(f"KeyError: Missing key in row: {e}")
+                except Exception as e:
+                    logging.error(f"Error processing row: {e}")
+
+        for bucket, count in counts.items():
+            _log_written(rules, bucket, count)
+        _log_counts(rules, counts)
+
+    except FileNotFoundError as e:
+        logging.error(f"FileNotFoundError: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+    finally:
+        if pool is not None:
+            pool.close()
+        dedup.close()
+
+
+def _log_written(rules, bucket, count):
+    if bucket == rules.default:
+        logging.info(f"Written {count} rows to {rules.output_file(bucket)}")
+    else:
+        logging.info(f"Written {count} rows for {bucket}")
+
+
+def _log_counts(rules, counts):
+    # Print counts
+    for bucket in rules.buckets:
+        logging.info(f"{bucket} count: {counts[bucket]}")
+
+    logging.info(f"Unrecognized count: {counts[rules.default]}")
+
+
+def process_genders(csv_file, stream=False, spill_path=None, rules=None):
+    if stream:
+        return process_genders_stream(csv_file, spill_path=spill_path, rules=rules)
+
+    rules = rules or ClassificationRules.for_genders(["Male", "Female"])
+    output_files = rules.output_files()
+    data = {bucket: [] for bucket in output_files}
 
     try:
         # Read the CSV file
@@ -14,48 +133,30 @@ def process_genders(csv_file):
             reader = csv.DictReader(file, delimiter=",")
             for row in reader:
                 try:
-                    gender = row['Genere'].strip().capitalize()
-                    if gender in genders_to_count:
-                        recognized_data[gender].append(row)
-                    else:
-                        unrecognized_data.append(row)
+                    data[rules.classify(row[rules.column])].append(row)
+                except MissingValueError as e:
+                    logging.error(f"Skipping row: {e}")
                 except KeyError as e:
                     logging.error(f"KeyError: Missing key in row: {e}")
                 except Exception as e:
                     logging.error(f"Error processing row: {e}")
 
         # Remove duplicates based on the entire row content
-        for gender, rows in recognized_data.items():
-            recognized_data[gender] = [dict(t) for t in {tuple(row.items()) for row in rows}]
+        for bucket, rows in data.items():
+            data[bucket] = [dict(t) for t in {tuple(row.items()) for row in rows}]
 
-        unrecognized_data = [dict(t) for t in {tuple(row.items()) for row in unrecognized_data}]
-
-        # Write recognized genders to separate CSV files
-        for gender, rows in recognized_data.items():
+        # Write every bucket to its own CSV file
+        for bucket, rows in data.items():
             try:
-                with open(f"{gender.lower()}.csv", "w", newline='', encoding='utf-8') as file:
+                with open(output_files[bucket], "w", newline='', encoding='utf-8') as file:
                     writer = csv.DictWriter(file, fieldnames=reader.fieldnames)
                     writer.writeheader()
                     writer.writerows(rows)
-                logging.info(f"Written {len(rows)} rows for {gender}")
+                _log_written(rules, bucket, len(rows))
             except Exception as e:
-                logging.error(f"Error writing {gender.lower()}.csv: {e}")
-
-        # Write unrecognized genders to CSV
-        try:
-            with open("sconosciuti.csv", "w", newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=reader.fieldnames)
-                writer.writeheader()
-                writer.writerows(unrecognized_data)
-            logging.info(f"Written {len(unrecognized_data)} rows to sconosciuti.csv")
-        except Exception as e:
-            logging.error(f"Error writing sconosciuti.csv: {e}")
-
-        # Print counts
-        for gender, rows in recognized_data.items():
-            logging.info(f"{gender} count: {len(rows)}")
-
-        logging.info(f"Unrecognized count: {len(unrecognized_data)}")
+                logging.error(f"Error writing {output_files[bucket]}: {e}")
+
+        _log_counts(rules, {bucket: len(rows) for bucket, rows in data.items()})
 
     except FileNotFoundError as e:
         logging.error(f"FileNotFoundError: {e}")
@@ -8,17 +8,21 @@ def process_genders(csv_file: str, genders_to_count: list[str]) -> None:
     df = pd.read_csv(csv_file)
     df['Genere'] = df['Genere'].str.strip().str.capitalize()
 
+    # Split the rows once and reuse the groups for writing and counting
+    recognized = df['Genere'].isin(genders_to_count)
+    groups = dict(tuple(df[recognized].groupby('Genere', sort=False)))
+
     # Save recognized genders to separate CSV files
     for gender in genders_to_count:
-        df[df['Genere'] == gender].to_csv(f"{gender.lower()}.csv", index=False)
+        groups.get(gender, df.iloc[:0]).to_csv(f"{gender.lower()}.csv", index=False)
 
     # Save unrecognized genders
-    unrecognized_df = df[~df['Genere'].isin(genders_to_count)]
+    unrecognized_df = df[~recognized]
     unrecognized_df.to_csv("sconosciuti.csv", index=False)
 
     # Print counts
     for gender in genders_to_count:
-        logging.info(f"{gender} count: {len(df[df['Genere'] == gender])}")
+        logging.info(f"{gender} count: {len(groups.get(gender, ()))}")
 
     logging.info(f"Unrecognized count: {len(unrecognized_df)}")
     return
@@ -1,42 +1,49 @@
+from collections import defaultdict
+
+import numpy as np
 import pandas as pd
 import logging
 
+from columnar import output_path, reset_output, write_columnar
+from rules import ClassificationRules, WriterPool
+
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-def process_genders(csv_file: str, genders_to_count: list[str]) -> None:
-    # Load the CSV file
+def process_genders(csv_file: str, genders_to_count: list[str], rules: ClassificationRules = None,
+                    output_format: str = "csv") -> None:
+    # The default gender rules write the cleaned Genere back, custom rules keep
+    # the original values of their column
+    normalize = rules is None
+    rules = rules or ClassificationRules.for_genders(genders_to_count, file_pattern="{bucket}_pandas.csv")
+    column = rules.column
+    output_files = {bucket: output_path(output_file, output_format)
+                    for bucket, output_file in rules.output_files().items()}
+
+    # Load the CSV file with Arrow-backed columns; the classification column
+    # is dictionary encoded so only its unique values are ever cleaned
     try:
-        df = pd.read_csv(csv_file)
-        
-        # Handle NaN values in the Genere column
-        df['Genere'] = df['Genere'].fillna('')
-        
-        # Clean and capitalize gender values
-        df['Genere'] = df['Genere'].astype(str).str.strip().str.capitalize()
-        
-        # Save recognized genders to separate CSV files
-        for gender in genders_to_count:
-            gender_df = df[df['Genere'] == gender]
-            # Remove duplicates based on all columns
-            gender_df = gender_df.drop_duplicates()
-            output_file = f"{gender.lower()}_pandas.csv"
-            gender_df.to_csv(output_file, index=False)
-            logging.info(f"Written {len(gender_df)} rows for {gender} to {output_file}")
-        
-        # Save unrecognized genders
-        unrecognized_df = df[~df['Genere'].isin(genders_to_count)]
-        # Remove duplicates from unrecognized data
-        unrecognized_df = unrecognized_df.drop_duplicates()
-        output_file = "sconosciuti_pandas.csv"
-        unrecognized_df.to_csv(output_file, index=False)
-        logging.info(f"Written {len(unrecognized_df)} rows to {output_file}")
-        
-        # Print counts (after duplicate removal)
-        for gender in genders_to_count:
-            gender_count = len(df[df['Genere'] == gender].drop_duplicates())
-            logging.info(f"{gender} count (after duplicate removal): {gender_count}")
+        df = pd.read_csv(csv_file, dtype={column: "category"}, dtype_backend="pyarrow")
         
-        logging.info(f"Unrecognized count (after duplicate removal): {len(unrecognized_df)}")
+        # Clean and capitalize the categories, NaN values become ''
+        cleaned = normalize_genders(df[column])
+        if normalize:
+            df[column] = cleaned
+
+        # Route every row once through the rule table, via the category codes
+        groups = dict(tuple(df.groupby(rules.classify_values(cleaned), sort=False)))
+
+        # Save every bucket to its own output, removing duplicates based on all columns
+        counts = {}
+        for bucket, output_file in output_files.items():
+            bucket_df = groups.get(bucket, df.iloc[:0]).drop_duplicates()
+            if output_format == "csv":
+                bucket_df.to_csv(output_file, index=False)
+            else:
+                reset_output(output_file)
+                write_columnar(bucket_df, output_file, output_format, partition_col=column)
+            counts[bucket] = len(bucket_df)
+
+        _log_counts(rules, counts, output_files)
     
     except Exception as e:
         logging.error(f"Error processing file: {e}")
@@ -44,6 +51,85 @@ def process_genders(csv_file: str, genders_to_count: list[str]) -> None:
     return
 
 
+def _log_counts(rules: ClassificationRules, counts: dict[str, int], output_files: dict[str, str] = None) -> None:
+    output_files = output_files or rules.output_files()
+    for bucket in rules.buckets:
+        logging.info(f"Written {counts[bucket]} rows for {bucket} to {output_files[bucket]}")
+    logging.info(f"Written {counts[rules.default]} rows to {output_files[rules.default]}")
+
+    # Print counts (after duplicate removal)
+    for bucket in rules.buckets:
+        logging.info(f"{bucket} count (after duplicate removal): {counts[bucket]}")
+
+    logging.info(f"Unrecognized count (after duplicate removal): {counts[rules.default]}")
+
+
+def normalize_genders(genere: pd.Series) -> pd.Series:
+    """
+    Strip and capitalize a categorical Genere column by working on its
+    categories only, then map the rows back through the category codes.
+    Missing values become ''. Returns a new Series; the input is left as is.
+    """
+    genere = genere.astype("category")
+    categories = pd.Index(genere.cat.categories.astype(str)).str.strip().str.capitalize()
+    labels, uniques = pd.factorize(categories.append(pd.Index([""])))
+    # Missing values have code -1, which picks the trailing '' label
+    new_codes = labels[genere.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(new_codes, uniques), index=genere.index, name=genere.name)
+
+
+def process_genders_chunked(csv_file: str, genders_to_count: list[str], chunksize: int = 100_000,
+                            rules: ClassificationRules = None) -> None:
+    """
+    Single-pass variant of process_genders for files larger than RAM.
+    Each chunk is normalized once, split with one groupby and appended to
+    its output file. Duplicates are tracked across chunks with a 64-bit hash
+    per row, so only the hashes stay in memory. Values are read as text so
+    that identical rows hash the same way in every chunk. As in
+    process_genders, only the default gender rules write the cleaned values.
+    """
+    normalize = rules is None
+    rules = rules or ClassificationRules.for_genders(genders_to_count, file_pattern="{bucket}_pandas.csv")
+    output_files = rules.output_files()
+    counts = {bucket: 0 for bucket in output_files}
+    seen = set()
+    pool = None
+
+    try:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype=defaultdict(lambda: str, {rules.column: "category"}),
+                                 keep_default_na=False, na_values=[""]):
+            if pool is None:
+                # Truncate the outputs and write the headers once
+                pool = WriterPool(list(chunk.columns), lineterminator="\n")
+                pool.ensure(output_files.values())
+
+            cleaned = normalize_genders(chunk[rules.column])
+            if normalize:
+                chunk[rules.column] = cleaned
+
+            # Remove duplicates inside the chunk and against previous chunks
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            keep = ~pd.Series(hashes).duplicated().to_numpy()
+            keep &= np.fromiter((h not in seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+            seen.update(hashes[keep].tolist())
+            chunk = chunk[keep]
+
+            # Route every row with a single groupby on the rule table buckets
+            for bucket, group in chunk.groupby(rules.classify_values(cleaned[keep]), sort=False):
+                group.to_csv(pool.file(output_files[bucket]), header=False, index=False)
+                counts[bucket] += len(group)
+
+        _log_counts(rules, counts)
+
+    except Exception as e:
+        logging.error(f"Error processing file: {e}")
+    finally:
+        if pool is not None:
+            pool.close()
+
+    return
+
+
 if __name__ == "__main__":
     # Use our test data
     process_genders(csv_file="employees.csv", genders_to_count=["Male", "Female"]) 
\ No newline at end of file
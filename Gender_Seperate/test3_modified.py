@@ -1,38 +1,88 @@
+import dask
 import dask.dataframe as dd
 import logging
+import os
+import shutil
+import tempfile
+import pandas as pd
+
+from columnar import concat_feather, output_path, reset_output, write_columnar
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-def process_large_csv(input_file, gender_column="Genere"):
+OUTPUT_FILES = {"male": "male.csv", "female": "female.csv", "unknown": "unknown.csv"}
+
+
+def _write_partition(part, gender_column, columns, parts_dir, output_format="csv", partition_info=None):
+    """
+    Remove duplicates inside a hash partition, split it by gender and write
+    one part file per output. Returns the row counts of the written files.
+    """
+    part = part[columns].drop_duplicates()
+    number = partition_info["number"] if partition_info else 0
+    gender = part[gender_column].str.strip().str.capitalize()
+    buckets = {
+        "male": part[gender == "Male"],
+        "female": part[gender == "Female"],
+        "unknown": part[~gender.isin(["Male", "Female"]) | part[gender_column].isna()],
+    }
+    for name, rows in buckets.items():
+        if output_format == "csv":
+            rows.to_csv(os.path.join(parts_dir, f"{name}_{number:06d}.csv"), header=False, index=False)
+        elif output_format == "parquet":
+            # Parquet parts go straight into the final partitioned dataset
+            write_columnar(rows, output_path(OUTPUT_FILES[name], output_format), output_format,
+                           partition_col=gender_column, basename=f"part-{number:06d}")
+        else:
+            write_columnar(rows, os.path.join(parts_dir, f"{name}_{number:06d}.feather"), output_format,
+                           partition_col=gender_column)
+    return pd.DataFrame({name: [len(rows)] for name, rows in buckets.items()})
+
+
+def process_large_csv(input_file, gender_column="Genere", output_format="csv"):
+    parts_dir = None
     try:
-        # Read the CSV file and remove duplicates
-        df = dd.read_csv(input_file).drop_duplicates()
-        
-        known_genders = ["Male", "Female"]
-        
-        # Filter by gender
-        df_male = df[df[gender_column].str.strip().str.capitalize() == "Male"]
-        df_female = df[df[gender_column].str.strip().str.capitalize() == "Female"]
-        df_unknown = df[~df[gender_column].str.strip().str.capitalize().isin(known_genders) | df[gender_column].isna()]
-
-        # Save to CSV files with distinct names
-        df_male.to_csv("male.csv", single_file=True, index=False)
-        df_female.to_csv("female.csv", single_file=True, index=False)
-        df_unknown.to_csv("unknown.csv", single_file=True, index=False)
-
-        # Compute and log counts
-        male_count = len(df_male.compute())
-        female_count = len(df_female.compute())
-        unknown_count = len(df_unknown.compute())
-        
-        logging.info(f"Male count: {male_count}")
-        logging.info(f"Female count: {female_count}")
-        logging.info(f"Unknown count: {unknown_count}")
+        df = dd.read_csv(input_file)
+        columns = list(df.columns)
+        parts_dir = tempfile.mkdtemp(prefix="dask_parts_", dir=".")
+        output_files = {name: output_path(output_file, output_format) for name, output_file in OUTPUT_FILES.items()}
+        for output_file in output_files.values():
+            reset_output(output_file)
+
+        # Hash-partition the rows once so that identical rows land in the same
+        # partition; each partition can then drop its duplicates locally
+        df = df.assign(_row_hash=df.map_partitions(pd.util.hash_pandas_object, index=False))
+        df = df.shuffle(on="_row_hash", npartitions=df.npartitions)
+
+        # Dedup, split, write and count in a single graph
+        counts = df.map_partitions(_write_partition, gender_column, columns, parts_dir, output_format,
+                                   meta={name: "int64" for name in OUTPUT_FILES})
+        (counts,) = dask.compute(counts)
+
+        # Concatenate the written partitions into the final files
+        for name, output_file in output_files.items():
+            part_files = sorted(os.path.join(parts_dir, f) for f in os.listdir(parts_dir) if f.startswith(f"{name}_"))
+            if output_format == "feather":
+                concat_feather(part_files, output_file)
+            elif output_format == "csv":
+                with open(output_file, "w", newline="", encoding="utf-8") as out:
+                    pd.DataFrame(columns=columns).to_csv(out, index=False)
+                    for part_file in part_files:
+                        with open(part_file, newline="", encoding="utf-8") as part:
+                            shutil.copyfileobj(part, out)
+
+        # Counts come from the written partitions, no recomputation
+        logging.info(f"Male count: {counts['male'].sum()}")
+        logging.info(f"Female count: {counts['female'].sum()}")
+        logging.info(f"Unknown count: {counts['unknown'].sum()}")
         logging.info("Files successfully saved.")
 
     except Exception as e:
         logging.error(f"Error: {e}")
+    finally:
+        if parts_dir is not None:
+            shutil.rmtree(parts_dir, ignore_errors=True)
 
 # Use our test data
 if __name__ == "__main__":
-    process_large_csv("test_data.csv") 
\ No newline at end of file
+    process_large_csv("test_data.csv")
@@ -0,0 +1,213 @@
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from rules import ClassificationRules, MissingValueError
+from test1 import RowDeduplicator
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+GENDERS_TO_COUNT = ["Male", "Female"]
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+class _RecordSink:
+    """File-like target for csv.writer that remembers the byte length of every record."""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.lengths = array("Q")
+
+    def write(self, line):
+        data = line.encode("utf-8")
+        self.file.write(data)
+        self.lengths.append(len(data))
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(csv_file):
+    """Return the parsed header and the byte offset where the data rows start."""
+    with open(csv_file, "rb") as file:
+        line = file.readline()
+    header = next(csv.reader([line.decode("utf-8")]))
+    return header, len(line)
+
+
+def split_ranges(csv_file, data_start, chunk_bytes):
+    """
+    Split the data section of the file into byte ranges of about chunk_bytes.
+    Every range ends right after a newline that is outside a quoted field:
+    a newline is a record boundary only if the number of '"' bytes before it
+    is even (escaped "" quotes count twice and keep the parity).
+    """
+    size = os.path.getsize(csv_file)
+    ranges = []
+    start = data_start
+    quotes = 0  # quotes seen between data_start and pos
+    pos = data_start
+
+    with open(csv_file, "rb") as file:
+        def count_quotes(begin, end):
+            total = 0
+            file.seek(begin)
+            while begin < end:
+                block = file.read(min(BLOCK_SIZE, end - begin))
+                total += block.count(b'"')
+                begin += len(block)
+            return total
+
+        while start < size:
+            target = start + chunk_bytes
+            if target >= size:
+                ranges.append((start, size))
+                break
+            quotes += count_quotes(pos, target)
+            pos = target
+            boundary = None
+            file.seek(pos)
+            while boundary is None:
+                block = file.read(BLOCK_SIZE)
+                if not block:
+                    break
+                offset = 0
+                while True:
+                    newline = block.find(b"\n", offset)
+                    if newline == -1:
+                        quotes += block.count(b'"', offset)
+                        pos += len(block) - offset
+                        break
+                    quotes += block.count(b'"', offset, newline)
+                    pos += newline + 1 - offset
+                    offset = newline + 1
+                    if quotes % 2 == 0:
+                        boundary = pos
+                        break
+            if boundary is None:
+                ranges.append((start, size))
+                break
+            ranges.append((start, boundary))
+            start = boundary
+    return ranges
+
+
+def _process_range(csv_file, header, start, end, partial_dir, index, rules):
+    """Parse one byte range and write its deduplicated rows to partial files."""
+    with open(csv_file, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode("utf-8")
+
+    buckets = list(rules.output_files())
+    sinks = {bucket: _RecordSink(os.path.join(partial_dir, f"{index:06d}_{position}.csv"))
+             for position, bucket in enumerate(buckets)}
+    writers = {bucket: csv.DictWriter(sink, fieldnames=header) for bucket, sink in sinks.items()}
+    digests = {bucket: bytearray() for bucket in buckets}
+    seen = set()
+
+    reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=header, delimiter=",")
+    for row in reader:
+        try:
+            bucket = rules.classify(row[rules.column])
+            key = RowDeduplicator.digest(row.values())
+            if key in seen:
+                continue
+            writers[bucket].writerow(row)
+            seen.add(key)
+            digests[bucket] += key
+        except MissingValueError as e:
+            logging.error(f"Skipping row: {e}")
+        except KeyError as e:
+            logging.error(f"KeyError: Missing key in row: {e}")
+        except Exception as e:
+            logging.error(f"Error processing row: {e}")
+
+    result = {}
+    for bucket, sink in sinks.items():
+        sink.close()
+        result[bucket] = (sink.file.name, bytes(digests[bucket]), sink.lengths.tobytes())
+    return result
+
+
+def _append_partial(out, partial, seen):
+    """Append a partial output, skipping rows already written by earlier ranges."""
+    path, digests, lengths = partial
+    lengths = array("Q", lengths)
+    keys = [digests[i:i + 16] for i in range(0, len(digests), 16)]
+
+    with open(path, "rb") as file:
+        if seen.isdisjoint(keys):
+            # Common case: no duplicates across ranges, copy the file as is
+            shutil.copyfileobj(file, out, BLOCK_SIZE)
+            seen.update(keys)
+            return len(keys)
+
+        written = 0
+        for key, length in zip(keys, lengths):
+            record = file.read(length)
+            if key not in seen:
+                seen.add(key)
+                out.write(record)
+                written += 1
+        return written
+
+
+def process_genders_parallel(csv_file, workers=None, chunk_bytes=64 * 1024 * 1024, rules=None):
+    """
+    Multi-core variant of test1.process_genders. The input is split into
+    newline-aligned byte ranges that are parsed in a ProcessPoolExecutor;
+    each worker writes partial outputs that are then concatenated in input
+    order, dropping rows already seen in earlier ranges. Outputs and counts
+    are the same as test1.process_genders.
+    """
+    rules = rules or ClassificationRules.for_genders(GENDERS_TO_COUNT)
+    output_files = rules.output_files()
+    counts = {bucket: 0 for bucket in output_files}
+    partial_dir = None
+
+    try:
+        header, data_start = read_header(csv_file)
+        ranges = split_ranges(csv_file, data_start, chunk_bytes)
+        partial_dir = tempfile.mkdtemp(prefix="partials_", dir=".")
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_process_range, csv_file, header, start, end, partial_dir, index, rules)
+                       for index, (start, end) in enumerate(ranges)]
+            results = [future.result() for future in futures]
+
+        seen = set()
+        for bucket, output_file in output_files.items():
+            with open(output_file, "w", newline='', encoding='utf-8') as file:
+                csv.DictWriter(file, fieldnames=header).writeheader()
+            with open(output_file, "ab") as out:
+                for result in results:
+                    counts[bucket] += _append_partial(out, result[bucket], seen)
+
+        for bucket in rules.buckets:
+            logging.info(f"Written {counts[bucket]} rows for {bucket}")
+        logging.info(f"Written {counts[rules.default]} rows to {output_files[rules.default]}")
+
+        # Print counts
+        for bucket in rules.buckets:
+            logging.info(f"{bucket} count: {counts[bucket]}")
+
+        logging.info(f"Unrecognized count: {counts[rules.default]}")
+
+    except FileNotFoundError as e:
+        logging.error(f"FileNotFoundError: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+    finally:
+        if partial_dir is not None:
+            shutil.rmtree(partial_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # Specify the CSV file in the current directory
+    csv_file = "./test_data.csv"  # Replace with your actual filename
+    process_genders_parallel(csv_file)
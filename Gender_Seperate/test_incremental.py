@@ -0,0 +1,64 @@
+import csv
+import glob
+import json
+import os
+
+import pytest
+
+import incremental
+from benchmark import generate_csv
+from rules import ClassificationRules
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def write_rows(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def shard_inodes(output_dir):
+    return {path: os.stat(path).st_ino for path in glob.glob(os.path.join(output_dir, "*", "part-*.csv"))}
+
+
+@pytest.mark.parametrize("key_column", [None, "Email"])
+def test_only_touched_shards_are_rewritten(tmp_path, key_column):
+    input_file, output_dir = str(tmp_path / "employees.csv"), str(tmp_path / "split")
+    generate_csv(input_file, 3000, duplicate_rate=0)
+    incremental.process_genders_incremental(input_file, output_dir, key_column=key_column)
+    with open(os.path.join(output_dir, incremental.MANIFEST_FILE), encoding="utf-8") as file:
+        shard_count = json.load(file)["shard_count"]
+    assert shard_count == incremental._shard_count(3000, 3)
+    before = shard_inodes(output_dir)
+
+    # 1% churn: change 15 rows and add 15
+    rows = read_rows(input_file)
+    removed_rows = [dict(row) for row in rows[::200]]
+    for row in rows[::200]:
+        row["Nome"] += "-changed"
+    new_rows = [dict(row, Email=f"new{i}@example.com") for i, row in enumerate(rows[1::200])]
+    write_rows(input_file, rows + new_rows)
+    incremental.process_genders_incremental(input_file, output_dir, key_column=key_column)
+
+    # Shards holding a removed row or an added row, and nothing else
+    rules = ClassificationRules.for_genders(["Male", "Female"])
+    touched = set()
+    for row in removed_rows + rows[::200] + new_rows:
+        digest = incremental._key_digest(row[key_column]) if key_column else incremental._row_digest(row.values())
+        shard = incremental._shard(digest, shard_count)
+        touched.add(incremental._shard_path(output_dir, rules.output_file(rules.classify(row["Genere"])), shard))
+    after = shard_inodes(output_dir)
+    rewritten = {path for path, inode in after.items() if before.get(path) != inode}
+    with open(os.path.join(output_dir, incremental.MANIFEST_FILE), encoding="utf-8") as file:
+        last_run = json.load(file)["last_run"]
+
+    assert not last_run["full"]
+    assert (last_run["added"], last_run["removed"]) == (30, 15)
+    assert rewritten == touched
+    assert last_run["rewritten_partitions"] == len(touched)
+    assert len(touched) < len(before) / 3
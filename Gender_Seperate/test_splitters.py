@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pytest
+
+import rules
+import test1
+import test2_modified
+import test4
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data.csv")
+# Male, Female and sconosciuti rows of test_data.csv after duplicate removal
+EXPECTED_COUNTS = {"male": 4, "female": 5, "sconosciuti": 9}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    shutil.copy(TEST_DATA, tmp_path / "test_data.csv")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_pandas_columnar_outputs(workdir, output_format):
+    test2_modified.process_genders("test_data.csv", ["Male", "Female"], output_format=output_format)
+    for name, count in EXPECTED_COUNTS.items():
+        path = workdir / f"{name}_pandas.{output_format}"
+        if output_format == "parquet":
+            table = ds.dataset(path, format="parquet", partitioning="hive").to_table()
+        else:
+            table = feather.read_table(path)
+        assert table.num_rows == count
+
+
+@pytest.mark.parametrize("split", [
+    lambda path: test2_modified.process_genders(path, ["Male", "Female"]),
+    lambda path: test2_modified.process_genders_chunked(path, ["Male", "Female"], chunksize=2),
+])
+def test_pandas_default_rules_write_cleaned_genders(workdir, split):
+    with open("variants.csv", "w", newline="", encoding="utf-8") as file:
+        file.write("Genere,Nome\nMale,A\n male,A\nMALE,A\nFemale ,B\n")
+    split("variants.csv")
+    with open("male_pandas.csv", encoding="utf-8") as file:
+        assert file.read().splitlines() == ["Genere,Nome", "Male,A"]
+    with open("female_pandas.csv", encoding="utf-8") as file:
+        assert file.read().splitlines() == ["Genere,Nome", "Female,B"]
+
+
+@pytest.mark.parametrize("split", [
+    test1.process_genders,
+    lambda path: test1.process_genders(path, stream=True),
+    test4.process_genders_parallel,
+])
+def test_csv_backends_skip_short_rows(workdir, split):
+    with open("short.csv", "w", newline="", encoding="utf-8") as file:
+        file.write("Nome,Genere\nA,Male\nB\nC,Other\n")
+    split("short.csv")
+    for name, rows in {"male": ["A,Male"], "female": [], "sconosciuti": ["C,Other"]}.items():
+        with open(f"{name}.csv", encoding="utf-8") as file:
+            assert file.read().splitlines() == ["Nome,Genere"] + rows
+
+
+def test_csv_logs_only_successful_writes(workdir, caplog):
+    # A directory in place of male.csv makes that write fail
+    os.mkdir("male.csv")
+    with caplog.at_level("INFO"):
+        test1.process_genders("test_data.csv")
+    assert "Error writing male.csv" in caplog.text
+    assert "rows for Male" not in caplog.text
+    assert "Written 5 rows for Female" in caplog.text
+
+
+def test_rule_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(rules, "CACHE_SIZE", 10)
+    table = rules.ClassificationRules.for_genders(["Male", "Female"])
+    assert [table.classify(f"value {i}") for i in range(100)] == ["sconosciuti"] * 100
+    assert table.classify(" male ") == "Male"
+    assert len(table._table) == 10
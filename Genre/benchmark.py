@@ -0,0 +1,137 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import time
+from collections import Counter, defaultdict
+
+from org2 import MovieDatabase
+
+HEADER = ['Genre', 'Movie', 'Release Date', 'Year', 'Oscar Winner', 'Lead Actor']
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy',
+          'Horror', 'Musical', 'Romance', 'Sci-Fi', 'Thriller', 'Western']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+          'October', 'November', 'December']
+
+
+def generate_catalog(path, rows, actors=None, oscar_rate=0.05, seed=0):
+    """
+    Write a synthetic '|' separated catalog with the columns of sample_data.csv.
+    Actor popularity is skewed so a few actors have many movies, and a small
+    share of genres and actors is written with different case or spacing.
+    """
+    rng = random.Random(seed)
+    actors = actors or max(rows // 20, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, delimiter='|')
+        writer.writerow(HEADER)
+        for i in range(rows):
+            genre = rng.choice(GENRES)
+            actor = f"Actor {int(actors ** rng.random()) - 1}"
+            if rng.random() < 0.01:
+                genre, actor = genre.upper(), f" {actor.lower()} "
+            year = rng.randint(1920, 2024)
+            writer.writerow([genre, f"Movie {i}", f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {year}", year,
+                             'Yes' if rng.random() < oscar_rate else 'No', actor])
+
+
+def baseline_aggregates(db):
+    """The same aggregations as one pure Python pass over the rows, for timing and checking."""
+    genres, years, genre_years = Counter(), Counter(), defaultdict(Counter)
+    genre_labels, actor_labels = {}, {}
+    movies, oscars = Counter(), Counter()
+    for row in db.movies:
+        genre = genre_labels.setdefault(row['Genre'].strip().casefold(), row['Genre'].strip())
+        actor = actor_labels.setdefault(row['Lead Actor'].strip().casefold(), row['Lead Actor'].strip())
+        genres[genre] += 1
+        movies[actor] += 1
+        oscars[actor] += row['Oscar Winner'].strip().casefold() == 'yes'
+        if row['Year'].isdigit():
+            years[int(row['Year'])] += 1
+            genre_years[genre][int(row['Year'])] += 1
+    top = sorted(movies, key=lambda actor: (-movies[actor], actor))[:10]
+    return {
+        'count_by_genre': dict(genres),
+        'count_by_year': dict(years),
+        'count_by_genre_and_year': {genre: dict(counts) for genre, counts in genre_years.items()},
+        'top_actors': [(actor, movies[actor], oscars[actor]) for actor in top],
+    }
+
+
+def indexed_aggregates(db):
+    return {
+        'count_by_genre': db.count_by_genre(),
+        'count_by_year': db.count_by_year(),
+        'count_by_genre_and_year': db.count_by_genre_and_year(),
+        'top_actors': [tuple(stats) for stats in db.top_actors(10)],
+        'top_actors_by_oscars': db.top_actors(10, by='oscars'),
+        'oscar_rate_by_actor': db.oscar_rate_by_actor(min_movies=5),
+    }
+
+
+def best_time(call, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmark(rows, repeat, data_dir, baseline, report_path):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"movies_{rows}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {rows} rows in {path}...")
+        generate_catalog(path, rows)
+
+    start = time.perf_counter()
+    db = MovieDatabase(path)
+    load_seconds = time.perf_counter() - start
+    print(f"Loaded {len(db.movies)} movies in {load_seconds:.2f} s (snapshot cache is used after the first run)")
+
+    timings = {}
+    for name, call in [('count_by_genre', db.count_by_genre),
+                       ('count_by_year', db.count_by_year),
+                       ('count_by_genre_and_year', db.count_by_genre_and_year),
+                       ('actor_stats', db.actor_stats),
+                       ('oscar_rate_by_actor', lambda: db.oscar_rate_by_actor(min_movies=5)),
+                       ('top_actors', lambda: db.top_actors(10)),
+                       ('top_actors_by_oscar_rate', lambda: db.top_actors(10, by='oscar_rate', min_movies=5))]:
+        timings[name], _ = best_time(call, repeat)
+        print(f"{name:>26}: {timings[name] * 1000:10.1f} ms")
+
+    report = {
+        'machine': {'platform': platform.platform(), 'python': platform.python_version()},
+        'rows': rows,
+        'load_seconds': load_seconds,
+        'indexed_ms': {name: seconds * 1000 for name, seconds in timings.items()},
+    }
+
+    if baseline:
+        baseline_seconds, expected = best_time(lambda: baseline_aggregates(db), 1)
+        indexed_seconds, actual = best_time(lambda: indexed_aggregates(db), 1)
+        equivalent = all(actual[name] == expected[name] for name in expected)
+        print(f"\nPure Python pass: {baseline_seconds:.2f} s, indexed aggregations: {indexed_seconds:.2f} s "
+              f"({baseline_seconds / indexed_seconds:.0f}x), results {'match' if equivalent else 'DIFFER'}")
+        report.update({'baseline_seconds': baseline_seconds, 'indexed_seconds': indexed_seconds,
+                       'equivalent': equivalent})
+
+    with open(report_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the MovieDatabase aggregations on a synthetic catalog")
+    parser.add_argument("--rows", type=lambda value: int(float(value)), default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default="bench_data")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the pure Python comparison")
+    parser.add_argument("--report", default="aggregation_report.json")
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.repeat, args.data_dir, not args.no_baseline, args.report)
@@ -0,0 +1,196 @@
+import heapq
+import re
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Trigrams shared by more than this share of the documents are skipped when
+# collecting candidates, unless the rarer ones give too few
+COMMON_GRAM_SHARE = 0.05
+# Joins the documents of a chunk; NUL inside a text is treated as whitespace
+SEPARATOR = 0
+# Documents joined into one buffer per step while building
+BUILD_CHUNK = 1 << 18
+# Candidates beyond the edit distance bound are kept only with this trigram similarity
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text: str) -> str:
+    """Case-insensitive form used for indexing and matching, with whitespace (and NUL) collapsed."""
+    return ' '.join(text.replace('\0', ' ').casefold().split())
+
+
+def _padded(text: str) -> bytes:
+    # Two leading blanks and one trailing blank give word starts their own trigrams
+    return f"  {normalize(text)} ".encode('utf-8')
+
+
+def _padded_chunk(texts: Iterable[str]) -> bytes:
+    """The _padded form of many texts, separated by NUL, normalized in a few whole-buffer passes."""
+    text = re.sub(r'\s+', ' ', '\0'.join(text.replace('\0', ' ') for text in texts).casefold())
+    text = re.sub(r' ?\0 ?', '\0', text).strip(' ')
+    return ('  ' + text.replace('\0', ' \0  ') + ' ').encode('utf-8')
+
+
+def _distinct(values: np.ndarray) -> np.ndarray:
+    # Sort based; np.unique is much slower on large int64 arrays with numpy 2
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+
+def _runs(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and length of every run of equal values in a sorted array."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return starts, np.diff(np.append(starts, len(values)))
+
+
+def _gram_codes(data: np.ndarray) -> np.ndarray:
+    """24-bit codes of all byte trigrams in data."""
+    data = data.astype(np.int64)
+    return (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+
+
+def bounded_edit_distance(a: str, b: str, bound: int) -> int:
+    """Levenshtein distance between a and b, or bound + 1 as soon as it must exceed bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i]
+        for j, char_a in enumerate(a, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return min(previous[-1], bound + 1)
+
+
+class TrigramIndex:
+    """
+    Inverted index from byte trigrams of the normalized text to document ids,
+    in CSR form: the documents containing grams[g] are
+    postings[starts[g]:starts[g + 1]], in id order. Trigrams are taken over
+    the UTF-8 bytes so the index is built with numpy from joined buffers.
+    """
+
+    def __init__(self, grams: np.ndarray, starts: np.ndarray, postings: np.ndarray, doc_grams: np.ndarray):
+        self.grams = grams
+        self.starts = starts
+        self.postings = postings
+        self.doc_grams = doc_grams
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> 'TrigramIndex':
+        """
+        Build in two passes over chunks of documents, so the temporary arrays
+        stay small: count the documents of every trigram that occurs, then
+        place each chunk's postings at the running offset of its trigram.
+        A catalog that fits in one chunk is paired only once.
+        """
+        chunks = list(cls._chunk_pairs(texts)) if len(texts) <= BUILD_CHUNK else None
+        doc_grams = np.zeros(len(texts), dtype=np.int32)
+        chunk_grams, chunk_counts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for start, stop, codes, docs in chunks or cls._chunk_pairs(texts):
+            run_starts, run_lengths = _runs(codes)
+            chunk_grams.append(codes[run_starts])
+            chunk_counts.append(run_lengths)
+            doc_grams[start:stop] = np.bincount(docs - start, minlength=stop - start)
+
+        # Document counts of the distinct trigrams, merged over the chunks
+        all_grams = np.concatenate(chunk_grams)
+        order = np.argsort(all_grams, kind='stable')
+        all_grams, all_counts = all_grams[order], np.concatenate(chunk_counts)[order]
+        run_starts, _ = _runs(all_grams)
+        grams = all_grams[run_starts]
+        counts = np.add.reduceat(all_counts, run_starts) if len(run_starts) else all_counts
+        starts = np.concatenate(([0], np.cumsum(counts)))
+        postings = np.empty(starts[-1], dtype=np.int32)
+        offsets = starts[:-1].copy()
+        for _, _, codes, docs in chunks or cls._chunk_pairs(texts):
+            run_starts, run_lengths = _runs(codes)
+            slots = np.searchsorted(grams, codes[run_starts])
+            rank = np.arange(len(codes)) - np.repeat(run_starts, run_lengths)
+            postings[np.repeat(offsets[slots], run_lengths) + rank] = docs
+            offsets[slots] += run_lengths
+        return cls(grams, starts, postings, doc_grams)
+
+    @staticmethod
+    def _chunk_pairs(texts: Sequence[str]):
+        """Distinct (trigram, document) pairs of each chunk, sorted by trigram then document."""
+        for start in range(0, len(texts), BUILD_CHUNK):
+            stop = min(start + BUILD_CHUNK, len(texts))
+            data = np.frombuffer(_padded_chunk(texts[i] for i in range(start, stop)), dtype=np.uint8)
+            is_separator = data == SEPARATOR
+            valid = ~(is_separator[:-2] | is_separator[1:-1] | is_separator[2:])
+            docs = np.cumsum(is_separator)[:-2][valid] + start
+            pairs = _distinct((_gram_codes(data)[valid] << 32) | docs)
+            yield start, stop, pairs >> 32, pairs & 0xFFFFFFFF
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'grams': self.grams, 'starts': self.starts, 'postings': self.postings, 'doc_grams': self.doc_grams}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'TrigramIndex':
+        return cls(arrays['grams'], arrays['starts'], arrays['postings'], arrays['doc_grams'])
+
+    def candidates(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        Up to limit (document id, similarity) pairs for documents sharing
+        trigrams with the query, best trigram similarity (shared / union of
+        distinct trigrams) first.
+        """
+        padded = np.frombuffer(_padded(query), dtype=np.uint8)
+        query_grams = np.unique(_gram_codes(padded))
+        positions = np.searchsorted(self.grams, query_grams)
+        found = positions < len(self.grams)
+        found[found] = self.grams[positions[found]] == query_grams[found]
+        positions = positions[found]
+        if not len(positions):
+            return []
+
+        # Rarest trigrams first; common ones are only read while there are too few candidates
+        sizes = self.starts[positions + 1] - self.starts[positions]
+        order = np.argsort(sizes, kind='stable')
+        positions, sizes = positions[order], sizes[order]
+        used = max(int(np.searchsorted(np.cumsum(sizes), limit)) + 1,
+                   int(np.count_nonzero(sizes <= COMMON_GRAM_SHARE * len(self.doc_grams))))
+        selective = positions[:used]
+        if len(selective) == 1:
+            # A single posting list is already distinct and sorted
+            docs = self.postings[self.starts[selective[0]]:self.starts[selective[0] + 1]]
+            shared = np.ones(len(docs), dtype=np.int64)
+        else:
+            hits = np.sort(np.concatenate([self.postings[self.starts[g]:self.starts[g + 1]] for g in selective]))
+            run_starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+            docs, shared = hits[run_starts], np.diff(np.append(run_starts, len(hits)))
+        similarity = shared / (len(query_grams) + self.doc_grams[docs] - shared)
+
+        if len(docs) > limit:
+            best = np.argpartition(-similarity, limit - 1)[:limit]
+            docs, similarity = docs[best], similarity[best]
+        order = np.lexsort((docs, -similarity))
+        return list(zip(docs[order].tolist(), similarity[order].tolist()))
+
+    def search(self, query: str, text_of: Callable[[int], str], k: int = 10,
+               max_distance: int = None, candidates: int = 200) -> List[int]:
+        """
+        Top k document ids for a possibly misspelled query. Trigram candidates
+        are re-ranked by edit distance to the normalized text, bounded by
+        max_distance (default: a quarter of the query length, at least 2);
+        candidates further away follow in trigram similarity order if they
+        are similar enough, e.g. when the query is part of a longer title.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        bound = max(2, len(query) // 4) if max_distance is None else max_distance
+        ranked = []
+        for rank, (doc, similarity) in enumerate(self.candidates(query, max(candidates, k))):
+            distance = bounded_edit_distance(query, normalize(text_of(doc)), bound)
+            if distance <= bound or similarity >= MIN_SIMILARITY:
+                ranked.append((distance, rank, doc))
+        return [doc for _, _, doc in heapq.nsmallest(k, ranked)]
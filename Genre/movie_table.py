@@ -0,0 +1,204 @@
+import sys
+from array import array
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+FIELDS = ['Genre', 'Movie', 'Release Date', 'Year', 'Oscar Winner', 'Lead Actor']
+# Low-cardinality fields stored as integer codes into a list of interned strings
+DICTIONARY_FIELDS = ['Genre', 'Release Date', 'Oscar Winner', 'Lead Actor']
+MISSING_YEAR = np.iinfo(np.int32).min
+MAX_YEAR = np.iinfo(np.int32).max
+
+
+class DictionaryColumn:
+    """String column stored as int32 codes into a list of interned values."""
+
+    def __init__(self, values: List[str], codes: np.ndarray):
+        self.values = values
+        self.codes = codes
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class TextColumn:
+    """High-cardinality string column stored as one UTF-8 buffer plus offsets."""
+
+    def __init__(self, data: bytes, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class YearColumn:
+    """Integer year column; values not written as plain integers keep their original text."""
+
+    def __init__(self, years: np.ndarray, raw: Dict[int, str]):
+        self.years = years
+        self.raw = raw
+
+    def __getitem__(self, i: int) -> str:
+        text = self.raw.get(i)
+        return str(self.years[i]) if text is None else text
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+
+class MovieRow:
+    """Read-only dict-like view of one row of a MovieTable."""
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'MovieTable', index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, field: str) -> str:
+        return self._table.columns[field][self._index]
+
+    def get(self, field: str, default=None):
+        column = self._table.columns.get(field)
+        return default if column is None else column[self._index]
+
+    def keys(self) -> List[str]:
+        return list(self._table.columns)
+
+    def values(self) -> List[str]:
+        return [column[self._index] for column in self._table.columns.values()]
+
+    def items(self):
+        return list(zip(self.keys(), self.values()))
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MovieRow):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"MovieRow({self.to_dict()!r})"
+
+
+class MovieTable:
+    """
+    Columnar movie catalog. Genre, Release Date, Oscar Winner and Lead Actor
+    are dictionary encoded with interned strings, Year is an int32 array and
+    Movie titles share one UTF-8 buffer. Rows are exposed as MovieRow views,
+    so code written for lists of dicts keeps working.
+    """
+
+    def __init__(self, columns: Dict[str, object]):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]]) -> 'MovieTable':
+        builder = MovieTableBuilder()
+        for row in rows:
+            builder.append(row)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.columns['Movie'])
+
+    def __getitem__(self, i: int) -> MovieRow:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("row index out of range")
+        return MovieRow(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield MovieRow(self, i)
+
+    def codes(self, field: str) -> np.ndarray:
+        return self.columns[field].codes
+
+    def dictionary(self, field: str) -> List[str]:
+        return self.columns[field].values
+
+    @property
+    def years(self) -> np.ndarray:
+        return self.columns['Year'].years
+
+    def unique(self, field: str) -> set:
+        """Distinct values of a column; O(unique) for dictionary encoded columns."""
+        column = self.columns[field]
+        if isinstance(column, DictionaryColumn):
+            return set(column.values)
+        return {column[i] for i in range(len(column))}
+
+
+class MovieTableBuilder:
+    """Appends rows one at a time into compact buffers, then builds a MovieTable."""
+
+    def __init__(self):
+        self._lookups = {field: {} for field in DICTIONARY_FIELDS}
+        self._codes = {field: array('i') for field in DICTIONARY_FIELDS}
+        self._titles = bytearray()
+        self._offsets = array('q', [0])
+        self._years = array('i')
+        self._raw_years = {}
+
+    def __len__(self) -> int:
+        return len(self._years)
+
+    def unique(self, field: str) -> set:
+        """Distinct values of the rows appended so far."""
+        if field in DICTIONARY_FIELDS:
+            return set(self._lookups[field])
+        if field == 'Movie':
+            titles = bytes(self._titles)
+            return {titles[start:end].decode('utf-8') for start, end in zip(self._offsets[:-1], self._offsets[1:])}
+        return {self._raw_years.get(i, str(year)) for i, year in enumerate(self._years)}
+
+    def append(self, row: Dict[str, str]):
+        for field in DICTIONARY_FIELDS:
+            value = row[field] or ''
+            lookup = self._lookups[field]
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            self._codes[field].append(code)
+
+        self._titles += (row['Movie'] or '').encode('utf-8')
+        self._offsets.append(len(self._titles))
+
+        text = row['Year']
+        try:
+            year = int(text)
+        except (TypeError, ValueError):
+            year = MISSING_YEAR
+        if not MISSING_YEAR < year <= MAX_YEAR:
+            # Years that do not fit the int32 column are kept as text only
+            year = MISSING_YEAR
+        if year == MISSING_YEAR or str(year) != text:
+            self._raw_years[len(self._years)] = text or ''
+        self._years.append(year)
+
+    def build(self) -> MovieTable:
+        columns = {}
+        for field in FIELDS:
+            if field in DICTIONARY_FIELDS:
+                values = [sys.intern(value) for value in self._lookups[field]]
+                columns[field] = DictionaryColumn(values, np.frombuffer(self._codes[field], dtype=np.int32).copy())
+            elif field == 'Movie':
+                columns[field] = TextColumn(bytes(self._titles), np.frombuffer(self._offsets, dtype=np.int64).copy())
+            else:
+                columns[field] = YearColumn(np.frombuffer(self._years, dtype=np.int32).copy(), dict(self._raw_years))
+        return MovieTable(columns)
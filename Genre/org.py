@@ -2,25 +2,231 @@ import csv
 
 import sys
 
+import threading
+
 
 
 EXPECTED_COLUMNS = ["Genre", "Movie", "Release Date", "Year", "Oscar Winner", "Lead Actor"]
 
+# Rows the background loader parses before taking the lock to publish them
+
+LOAD_BATCH = 10000
+
+
+
+def report_bad_row(line, message):
+
+    print(f"Warning: line {line}: {message}", file=sys.stderr)
+
+
+
+def open_reader(file_path):
+
+    file = open(file_path, mode='r', newline='', encoding='utf-8')
+
+    reader = csv.DictReader(file, delimiter='|')
+
+    if reader.fieldnames != EXPECTED_COLUMNS:
+
+        file.close()
+
+        raise ValueError("File does not contain the expected columns.")
+
+    return file, reader
+
+
+
+def validate_row(row):
+
+    # Returns what is wrong with the row and whether it is kept anyway, or (None, True) if it is valid.
+
+    # Only rows with missing fields are skipped: their columns have no value. Extra fields
+
+    # are reported and dropped, the row keeps its first columns as before
+
+    if None in row:
+
+        return f"expected {len(EXPECTED_COLUMNS)} fields, got {len(EXPECTED_COLUMNS) + len(row[None])}", True
+
+    missing = [column for column in EXPECTED_COLUMNS if row[column] is None]
+
+    if missing:
+
+        return f"expected {len(EXPECTED_COLUMNS)} fields, got {len(EXPECTED_COLUMNS) - len(missing)}", False
+
+    if not row["Movie"].strip():
+
+        return "empty movie title", True
+
+    if not row["Year"].strip().isdigit():
+
+        return f"invalid year {row['Year']!r}", True
+
+    return None, True
+
+
+
+def iter_rows(reader, on_error=report_bad_row):
+
+    # Yields rows one at a time; bad rows are reported with their line number, short ones are skipped
+
+    try:
+
+        for row in reader:
+
+            error, keep = validate_row(row)
+
+            if error is not None:
+
+                on_error(reader.line_num, error if keep else f"{error}; row skipped")
+
+            if keep:
+
+                yield row
+
+    except (csv.Error, UnicodeDecodeError) as e:
+
+        on_error(reader.line_num, f"{e}; stopped reading")
+
+
+
+class LazyCatalog:
+
+    # Catalog that keeps parsing in a background thread while it is already being used
+
+
+
+    def __init__(self, file, reader, on_error=report_bad_row):
+
+        from movie_table import MovieTableBuilder
+
+        self._builder = MovieTableBuilder()
+
+        self._lock = threading.Lock()
+
+        self._done = threading.Event()
+
+        self._table = None
+
+        self._on_error = on_error
+
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._load, args=(file, reader), daemon=True)
+
+        self._thread.start()
 
 
-def read_file(file_path):
+
+    def _report(self, line, message):
+
+        self.errors += 1
+
+        self._on_error(line, message)
+
+
+
+    def _load(self, file, reader):
+
+        try:
+
+            with file:
+
+                batch = []
+
+                for row in iter_rows(reader, self._report):
+
+                    batch.append(row)
+
+                    if len(batch) == LOAD_BATCH:
+
+                        self._publish(batch)
+
+                        batch = []
+
+                self._publish(batch)
+
+        finally:
+
+            self._done.set()
+
+
+
+    def _publish(self, rows):
+
+        with self._lock:
+
+            for row in rows:
+
+                self._builder.append(row)
+
+
+
+    @property
+
+    def loading(self):
+
+        return not self._done.is_set()
+
+
+
+    def __len__(self):
+
+        with self._lock:
+
+            return len(self._builder)
+
+
+
+    def wait(self, timeout=None):
+
+        return self._done.wait(timeout)
+
+
+
+    def unique(self, field):
+
+        # Distinct values read so far, taken from the builder's buffers
+
+        with self._lock:
+
+            return self._builder.unique(field)
+
+
+
+    def table(self):
+
+        self.wait()
+
+        if self._table is None:
+
+            self._table = self._builder.build()
+
+        return self._table
+
+
+
+def read_file(file_path, lazy=False):
+
+    # With lazy=True the header is checked here and the rows are parsed in the background
 
     try:
 
-        with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+        file, reader = open_reader(file_path)
 
-            reader = csv.DictReader(file, delimiter='|')
+        if lazy:
 
-            if reader.fieldnames != EXPECTED_COLUMNS:
+            return LazyCatalog(file, reader)
 
-                raise ValueError("File does not contain the expected columns.")
+        with file:
 
-            return list(reader)
+            # Imported here: pickle probes for an 'org' package while numpy is being
+
+            # imported, so this module must not pull numpy in at import time
+
+            from movie_table import MovieTable
+
+            return MovieTable.from_rows(iter_rows(reader))
 
     except FileNotFoundError:
 
@@ -38,7 +244,7 @@ def read_file(file_path):
 
 def display_actors(data):
 
-    actors = {row["Lead Actor"] for row in data}
+    actors = data.unique("Lead Actor")
 
     print("\nActors:")
 
@@ -50,7 +256,7 @@ def display_actors(data):
 
 def display_movies(data):
 
-    movies = {row["Movie"] for row in data}
+    movies = data.unique("Movie")
 
     print("\nMovies:")
 
@@ -62,7 +268,7 @@ def display_movies(data):
 
 def display_genres(data):
 
-    genres = {row["Genre"] for row in data}
+    genres = data.unique("Genre")
 
     print("\nGenres:")
 
@@ -84,12 +290,20 @@ def main():
 
     file_path = sys.argv[1]
 
-    data = read_file(file_path)
+    data = read_file(file_path, lazy=True)
+
+    # Small files are fully loaded before the first menu, large ones keep loading behind it
+
+    data.wait(1)
 
 
 
     while True:
 
+        if data.loading:
+
+            print(f"\n(Still loading: {len(data)} rows read so far, lists may be incomplete)")
+
         print("\nMenu:")
 
         print("1. Display Actors")
@@ -1,19 +1,85 @@
 import csv
-from typing import List, Dict
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, NamedTuple, Tuple
+import os
 import sys
 
+import numpy as np
+
+import snapshot
+from fuzzy import TrigramIndex
+from movie_table import MAX_YEAR, MISSING_YEAR, MovieRow, MovieTable
+
+
+class ActorStats(NamedTuple):
+    actor: str
+    movies: int
+    oscars: int
+
+    @property
+    def oscar_rate(self) -> float:
+        return self.oscars / self.movies if self.movies else 0.0
+
 
 class MovieDatabase:
     EXPECTED_HEADERS = ['Genre', 'Movie', 'Release Date', 'Year', 'Oscar Winner', 'Lead Actor']
+    # Index attributes stored in the snapshot cache next to the table
+    ARRAY_INDEXES = ['title_order', 'prefix_order', 'genre_order', 'genre_starts', 'actor_order',
+                     'actor_starts', 'year_order', 'year_keys', 'oscar_winners']
+    META_INDEXES = ['genre_keys', 'actor_keys', 'actor_labels', 'actors', 'genres']
+    TRIGRAM_INDEXES = ['title_trigrams', 'actor_trigrams']
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, use_cache: bool = True):
+        if use_cache and self.load_snapshot(filename):
+            return
+        # Key taken before parsing, so an edit made during the load invalidates the snapshot
+        key = snapshot.source_key(filename) if use_cache and os.path.exists(filename) else None
         self.movies = self.load_data(filename)
+        self.build_indexes()
+        if key is not None:
+            self.save_snapshot(filename, key)
+
+    def load_snapshot(self, filename: str) -> bool:
+        """Load the table and indexes from the binary cache if it matches the file."""
+        try:
+            cached = snapshot.load_snapshot(snapshot.cache_path(filename), snapshot.source_key(filename))
+        except OSError:
+            return False
+        if cached is None:
+            return False
+        table, arrays, meta = cached
+        try:
+            indexes = {name: arrays[name] for name in self.ARRAY_INDEXES}
+            indexes.update({name: meta[name] for name in self.META_INDEXES})
+            for name in self.TRIGRAM_INDEXES:
+                prefix = name + '/'
+                indexes[name] = TrigramIndex.from_arrays(
+                    {part[len(prefix):]: array for part, array in arrays.items() if part.startswith(prefix)})
+        except KeyError:
+            # Written by an older version without some of the indexes
+            return False
+        self.movies = table
+        for name, value in indexes.items():
+            setattr(self, name, value)
+        return True
+
+    def save_snapshot(self, filename: str, key: Dict):
+        """Write the binary cache; the old snapshot is replaced atomically."""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_INDEXES}
+        for name in self.TRIGRAM_INDEXES:
+            arrays.update({f'{name}/{part}': array for part, array in getattr(self, name).arrays().items()})
+        try:
+            snapshot.save_snapshot(snapshot.cache_path(filename), key, self.movies, arrays,
+                                   {name: getattr(self, name) for name in self.META_INDEXES})
+        except OSError as e:
+            print(f"Warning: could not write the cache for '{filename}': {e}")
 
     def validate_headers(self, headers: List[str]) -> bool:
         """Validate if the file headers match the expected format."""
         return headers == self.EXPECTED_HEADERS
 
-    def load_data(self, filename: str) -> List[Dict]:
+    def load_data(self, filename: str) -> MovieTable:
         """Load and validate the movie data from the file."""
         try:
             with open(filename, 'r') as file:
@@ -26,7 +92,7 @@ class MovieDatabase:
 
                 # Read the rest of the file as CSV with '|' delimiter
                 reader = csv.DictReader(file, fieldnames=headers, delimiter='|')
-                return [row for row in reader]
+                return MovieTable.from_rows(reader)
 
         except FileNotFoundError:
             print(f"Error: File '{filename}' not found.")
@@ -35,27 +101,201 @@ class MovieDatabase:
             print(f"Error processing file: {str(e)}")
             sys.exit(1)
 
+    def build_indexes(self):
+        """Build the inverted indexes and sorted arrays used by the queries, once per load."""
+        table = self.movies
+        titles = table.columns['Movie']
+
+        # Row ids ordered by title; every other index keeps this order
+        self.title_order = np.array(sorted(range(len(table)), key=titles.__getitem__), dtype=np.int64)
+        # Case-insensitive order for prefix search, probed with bisect on demand
+        self.prefix_order = np.array(sorted(range(len(table)), key=lambda i: titles[i].strip().casefold()),
+                                     dtype=np.int64)
+
+        self.genre_keys, self.genre_order, self.genre_starts = self._group_index('Genre')
+        self.actor_keys, self.actor_order, self.actor_starts = self._group_index('Lead Actor')
+
+        years = table.years
+        self.year_order = self.title_order[np.argsort(years[self.title_order], kind='stable')]
+        self.year_keys = years[self.year_order]
+
+        is_winner = np.array([value.strip().casefold() == 'yes' for value in table.dictionary('Oscar Winner')],
+                             dtype=bool)
+        winners = is_winner[table.codes('Oscar Winner')]
+        self.oscar_winners = self.title_order[winners[self.title_order]]
+
+        self.actors = sorted({actor.strip() for actor in table.dictionary('Lead Actor')})
+        self.genres = sorted({genre.strip() for genre in table.dictionary('Genre')})
+
+        # Typo-tolerant search: titles are indexed per row, actors per group
+        self.actor_labels = self._group_labels('Lead Actor', self.actor_keys)
+        self.title_trigrams = TrigramIndex.build(titles)
+        self.actor_trigrams = TrigramIndex.build(self.actor_labels)
+
+    def _group_index(self, field: str):
+        """
+        Inverted index over a dictionary encoded column in CSR form: the rows
+        of group g are order[starts[g]:starts[g + 1]], sorted by title.
+        Values that differ only by case or spaces share a group.
+        """
+        keys = {}
+        groups = np.array([keys.setdefault(value.strip().casefold(), len(keys))
+                           for value in self.movies.dictionary(field)], dtype=np.int64)
+        row_groups = groups[self.movies.codes(field)] if len(groups) else np.zeros(0, dtype=np.int64)
+        order = self.title_order[np.argsort(row_groups[self.title_order], kind='stable')]
+        starts = np.concatenate(([0], np.cumsum(np.bincount(row_groups, minlength=len(keys)))))
+        return keys, order, starts
+
+    def _rows(self, ids) -> List[MovieRow]:
+        return [self.movies[int(i)] for i in ids]
+
+    def _group_rows(self, keys: Dict[str, int], order: np.ndarray, starts: np.ndarray, value: str) -> List[MovieRow]:
+        group = keys.get(value.strip().casefold())
+        if group is None:
+            return []
+        return self._rows(order[starts[group]:starts[group + 1]])
+
+    def movies_by_actor(self, actor: str) -> List[MovieRow]:
+        """Movies with the given lead actor, sorted by title."""
+        return self._group_rows(self.actor_keys, self.actor_order, self.actor_starts, actor)
+
+    def movies_by_genre(self, genre: str) -> List[MovieRow]:
+        """Movies of the given genre, sorted by title."""
+        return self._group_rows(self.genre_keys, self.genre_order, self.genre_starts, genre)
+
+    def movies_by_year(self, start: int, end: int) -> List[MovieRow]:
+        """Movies released between start and end (inclusive), sorted by year."""
+        # year_keys is int32: clamp the bounds to the stored years, which also
+        # leaves out the rows without a numeric year
+        start, end = max(start, MISSING_YEAR + 1), min(end, MAX_YEAR)
+        if start > end:
+            return []
+        lo = np.searchsorted(self.year_keys, start, side='left')
+        hi = np.searchsorted(self.year_keys, end, side='right')
+        return self._rows(self.year_order[lo:hi])
+
+    def search_titles(self, prefix: str) -> List[MovieRow]:
+        """Movies whose title starts with prefix (case-insensitive)."""
+        prefix = prefix.strip().casefold()
+        titles = self.movies.columns['Movie']
+        key = lambda i: titles[i].strip().casefold()
+        lo = bisect_left(self.prefix_order, prefix, key=key)
+        hi = bisect_right(self.prefix_order, prefix + '\U0010ffff', key=key)
+        return self._rows(self.prefix_order[lo:hi])
+
+    def oscar_winning_movies(self) -> List[MovieRow]:
+        """Movies that won an Oscar, sorted by title."""
+        return self._rows(self.oscar_winners)
+
+    def _group_ids(self, keys: Dict[str, int], order: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Group id of every row, recovered from a CSR index."""
+        ids = np.empty(len(self.movies), dtype=np.int64)
+        ids[order] = np.repeat(np.arange(len(keys), dtype=np.int64), np.diff(starts))
+        return ids
+
+    def _group_labels(self, field: str, keys: Dict[str, int]) -> List[str]:
+        """Display name of every group: the first spelling in the file, stripped."""
+        labels = [None] * len(keys)
+        for value in self.movies.dictionary(field):
+            group = keys[value.strip().casefold()]
+            if labels[group] is None:
+                labels[group] = value.strip()
+        return labels
+
+    def _actor_counts(self) -> Tuple[List[str], List[int], List[int]]:
+        """Label, movie count and Oscar count of every actor group."""
+        is_winner = np.zeros(len(self.movies), dtype=bool)
+        is_winner[self.oscar_winners] = True
+        won = np.concatenate(([0], np.cumsum(is_winner[self.actor_order])))[self.actor_starts]
+        return (self.actor_labels,
+                np.diff(self.actor_starts).tolist(), np.diff(won).tolist())
+
+    def count_by_genre(self) -> Dict[str, int]:
+        """Number of movies per genre, most common first."""
+        labels = self._group_labels('Genre', self.genre_keys)
+        counts = np.diff(self.genre_starts).tolist()
+        return {labels[g]: counts[g] for g in sorted(range(len(labels)), key=lambda g: (-counts[g], labels[g]))}
+
+    def count_by_year(self) -> Dict[int, int]:
+        """Number of movies per year in year order; rows without a numeric year are left out."""
+        years, counts = np.unique(self.year_keys, return_counts=True)
+        return {int(year): int(count) for year, count in zip(years, counts) if year != MISSING_YEAR}
+
+    def count_by_genre_and_year(self) -> Dict[str, Dict[int, int]]:
+        """Number of movies per genre and year, as {genre: {year: count}}."""
+        genre_ids = self._group_ids(self.genre_keys, self.genre_order, self.genre_starts)
+        years, year_ids = np.unique(self.movies.years, return_inverse=True)
+        cells = np.bincount(genre_ids * len(years) + year_ids.ravel(), minlength=len(self.genre_keys) * len(years))
+        cells = cells.reshape(len(self.genre_keys), len(years))
+        result = {}
+        for genre, g in sorted((label, g) for g, label in enumerate(self._group_labels('Genre', self.genre_keys))):
+            result[genre] = {int(years[y]): int(cells[g, y]) for y in np.flatnonzero(cells[g])
+                             if years[y] != MISSING_YEAR}
+        return result
+
+    def actor_stats(self) -> List[ActorStats]:
+        """Movie and Oscar counts of every lead actor, in name order."""
+        labels, movies, oscars = self._actor_counts()
+        return sorted(ActorStats(*group) for group in zip(labels, movies, oscars))
+
+    def oscar_rate_by_actor(self, min_movies: int = 1) -> Dict[str, float]:
+        """Share of Oscar winning movies per actor with at least min_movies movies."""
+        return {stats.actor: stats.oscar_rate for stats in self.actor_stats() if stats.movies >= min_movies}
+
+    def top_actors(self, n: int = 10, by: str = 'movies', min_movies: int = 1) -> List[ActorStats]:
+        """
+        The n actors with the most movies, Oscars or the best Oscar rate
+        (by='movies', 'oscars' or 'oscar_rate'). Ties are broken by movie
+        count and name; only a heap of n candidates is kept.
+        """
+        labels, movies, oscars = self._actor_counts()
+        keys = {
+            'movies': lambda g: (-movies[g], labels[g]),
+            'oscars': lambda g: (-oscars[g], -movies[g], labels[g]),
+            'oscar_rate': lambda g: (-oscars[g] / movies[g], -movies[g], labels[g]),
+        }
+        if by not in keys:
+            raise ValueError(f"Unknown ranking '{by}', expected one of: {', '.join(keys)}")
+        candidates = (g for g in range(len(labels)) if movies[g] >= max(min_movies, 1))
+        return [ActorStats(labels[g], movies[g], oscars[g]) for g in heapq.nsmallest(n, candidates, key=keys[by])]
+
+    def fuzzy_search_titles(self, query: str, k: int = 10) -> List[MovieRow]:
+        """The k movies whose title best matches a possibly misspelled query."""
+        titles = self.movies.columns['Movie']
+        return self._rows(self.title_trigrams.search(query, titles.__getitem__, k))
+
+    def fuzzy_search_actors(self, query: str, k: int = 10) -> List[str]:
+        """The k lead actors whose name best matches a possibly misspelled query."""
+        return [self.actor_labels[g] for g in self.actor_trigrams.search(query, self.actor_labels.__getitem__, k)]
+
     def display_actors(self):
         """Display all unique actors in the database."""
-        actors = sorted(set(movie['Lead Actor'].strip() for movie in self.movies))
         print("\nLead Actors in the Database:")
         print("-" * 30)
-        for actor in actors:
+        for actor in self.actors:
             print(actor)
 
-    def display_movies(self):
+    def display_movies(self, movies: List[MovieRow] = None):
         """Display all movies with their details."""
         print("\nMovies in the Database:")
-        for movie in sorted(self.movies, key=lambda x: x['Movie']):
+        for movie in self._rows(self.title_order) if movies is None else movies:
             print(f"Title: {movie['Movie'].strip()}")
 
     def display_genres(self):
         """Display all unique genres in the database."""
-        genres = sorted(set(movie['Genre'].strip() for movie in self.movies))
         print("\nMovie Genres:")
-        for genre in genres:
+        for genre in self.genres:
             print(genre)
 
+    def display_statistics(self, n: int = 10):
+        """Display movie counts per genre and the actors with the most movies."""
+        print("\nMovies per Genre:")
+        for genre, count in self.count_by_genre().items():
+            print(f"{genre}: {count}")
+        print(f"\nTop {n} Actors:")
+        for stats in self.top_actors(n):
+            print(f"{stats.actor}: {stats.movies} movies, {stats.oscars} Oscars ({stats.oscar_rate:.0%})")
+
 
 def display_menu():
     """Display the main menu options."""
@@ -64,7 +304,14 @@ def display_menu():
     print("2. Display Movies")
     print("3. Display Genres")
     print("4. Exit")
-    return input("Enter your choice (1-4): ")
+    print("5. Movies by Actor")
+    print("6. Movies by Genre")
+    print("7. Movies by Year Range")
+    print("8. Search Titles")
+    print("9. Oscar Winners")
+    print("10. Statistics")
+    print("11. Fuzzy Search")
+    return input("Enter your choice (1-11): ")
 
 
 def main():
@@ -88,6 +335,29 @@ def main():
             elif choice == '4':
                 print("Closing the program!")
                 break
+            elif choice == '5':
+                db.display_movies(db.movies_by_actor(input("Actor: ")))
+            elif choice == '6':
+                db.display_movies(db.movies_by_genre(input("Genre: ")))
+            elif choice == '7':
+                try:
+                    start, end = int(input("From year: ")), int(input("To year: "))
+                except ValueError:
+                    print("Please enter a valid year.")
+                    continue
+                db.display_movies(db.movies_by_year(start, end))
+            elif choice == '8':
+                db.display_movies(db.search_titles(input("Title starts with: ")))
+            elif choice == '9':
+                db.display_movies(db.oscar_winning_movies())
+            elif choice == '10':
+                db.display_statistics()
+            elif choice == '11':
+                query = input("Title or actor: ")
+                print("\nClosest Actors:")
+                for actor in db.fuzzy_search_actors(query, 5):
+                    print(actor)
+                db.display_movies(db.fuzzy_search_titles(query))
             else:
                 print("Invalid choice. Please try again.")
 
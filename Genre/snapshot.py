@@ -0,0 +1,116 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from movie_table import DICTIONARY_FIELDS, DictionaryColumn, MovieTable, TextColumn, YearColumn
+
+MAGIC = b'MOVSNAP1'
+ALIGNMENT = 64
+CACHE_DIR = '.movie_cache'
+
+
+def source_key(filename: str) -> Dict:
+    """Identify a source file by path, size and modification time."""
+    stat = os.stat(filename)
+    return {'path': os.path.abspath(filename), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def cache_path(filename: str) -> str:
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, CACHE_DIR, name + '.snap')
+
+
+def _table_arrays(table: MovieTable) -> Tuple[Dict[str, np.ndarray], Dict]:
+    arrays = {f'codes/{field}': table.codes(field) for field in DICTIONARY_FIELDS}
+    titles = table.columns['Movie']
+    arrays['titles/data'] = np.frombuffer(titles.data, dtype=np.uint8)
+    arrays['titles/offsets'] = titles.offsets
+    arrays['years'] = table.years
+    meta = {
+        'dictionaries': {field: table.dictionary(field) for field in DICTIONARY_FIELDS},
+        'raw_years': {str(i): text for i, text in table.columns['Year'].raw.items()},
+    }
+    return arrays, meta
+
+
+def _table_from_arrays(arrays: Dict[str, np.ndarray], meta: Dict) -> MovieTable:
+    columns = {}
+    for field in ['Genre', 'Movie', 'Release Date', 'Year', 'Oscar Winner', 'Lead Actor']:
+        if field in DICTIONARY_FIELDS:
+            columns[field] = DictionaryColumn(meta['dictionaries'][field], arrays[f'codes/{field}'])
+        elif field == 'Movie':
+            columns[field] = TextColumn(arrays['titles/data'], arrays['titles/offsets'])
+        else:
+            raw = {int(i): text for i, text in meta['raw_years'].items()}
+            columns[field] = YearColumn(arrays['years'], raw)
+    return MovieTable(columns)
+
+
+def save_snapshot(path: str, key: Dict, table: MovieTable, indexes: Dict[str, np.ndarray], meta: Dict):
+    """
+    Write the table and its indexes as one file: magic, header length, a JSON
+    header and the raw arrays, each aligned so they can be memory mapped.
+    The file is written next to its final name and renamed into place.
+    """
+    arrays, table_meta = _table_arrays(table)
+    arrays.update({f'index/{name}': array for name, array in indexes.items()})
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'source': key, 'table': table_meta, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, array in arrays.items():
+                file.seek(data_start + layout[name]['offset'])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str, key: Dict) -> Optional[Tuple[MovieTable, Dict[str, np.ndarray], Dict]]:
+    """Memory map a snapshot; returns None if it is missing, corrupt or stale."""
+    try:
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if mapped[:len(MAGIC)] != MAGIC:
+            return None
+        (header_length,) = struct.unpack_from('<Q', mapped, len(MAGIC))
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(mapped[len(MAGIC) + 8:header_end])
+        if header['source'] != key:
+            return None
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                         offset=data_start + spec['offset']).reshape(spec['shape'])
+    except (ValueError, KeyError, struct.error):
+        return None
+
+    table = _table_from_arrays(arrays, header['table'])
+    indexes = {name[len('index/'):]: array for name, array in arrays.items() if name.startswith('index/')}
+    return table, indexes, header['meta']
@@ -20,32 +20,75 @@ def create_visual_vocabulary(image_set, patch_dim):
                 visual_vocab.append(image[i * patch_dim : (i + 1) * patch_dim, j * patch_dim : (j + 1) * patch_dim])
     return visual_vocab
 
+def extract_patches(image, patch_dim):
+    """
+    Funzione per estrarre le visual words di un'immagine senza cicli Python
+    params:
+        - image : immagine (2D, o 3D con i canali in fondo)
+        - patch_dim : dimensione delle visual words
+    returns:
+        - patches : matrice (n_patches, patch_dim * patch_dim * canali), righe nello stesso
+          ordine dei cicli su i e j
+    """
+    rows, cols = image.shape[0] // patch_dim, image.shape[1] // patch_dim
+    # ritaglio ai multipli di patch_dim e divisione in blocchi con una sola reshape
+    blocks = image[:rows * patch_dim, :cols * patch_dim].reshape(rows, patch_dim, cols, patch_dim, *image.shape[2:])
+    # larghezza esplicita: un'immagine più piccola della patch dà una matrice vuota, non un errore
+    return blocks.swapaxes(1, 2).reshape(rows * cols, patch_dim * patch_dim * int(np.prod(image.shape[2:])))
+
+
+def stack_vocabulary(visual_vocab):
+    """
+    Funzione per impilare il vocabolario in un'unica matrice
+    params:
+        - visual_vocab : lista di visual words (o matrice già impilata)
+    returns:
+        - vocab_matrix : matrice (V, patch_dim * patch_dim) in float64
+    """
+    # float64: con patch 20x20 di uint8 le somme arrivano a 2.6e7, oltre gli interi esatti
+    # di float32 (2^24), e le distanze devono restare esatte per avere gli stessi argmin
+    if isinstance(visual_vocab, np.ndarray) and visual_vocab.ndim == 2:
+        return visual_vocab.astype(np.float64, copy=False)
+    return np.stack([np.asarray(word).ravel() for word in visual_vocab]).astype(np.float64)
+
+
+def nearest_words(patches, vocab_matrix, batch_size=4096):
+    """
+    Funzione per trovare la visual word più vicina a ogni patch
+    params:
+        - patches : matrice (n_patches, d) delle visual words dell'immagine
+        - vocab_matrix : matrice (V, d) del vocabolario, da stack_vocabulary
+        - batch_size : patch elaborate per volta, limita la matrice delle distanze
+    returns:
+        - indices : indice della visual word più vicina per ogni patch (la prima in caso di parità)
+    """
+    vocab_sq = np.einsum('ij,ij->i', vocab_matrix, vocab_matrix)
+    indices = np.empty(len(patches), dtype=np.int64)
+    for start in range(0, len(patches), batch_size):
+        batch = patches[start:start + batch_size].astype(np.float64)
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab, con un solo prodotto matriciale per batch
+        dist = np.einsum('ij,ij->i', batch, batch)[:, None] + vocab_sq[None, :] - 2 * batch @ vocab_matrix.T
+        indices[start:start + batch_size] = np.argmin(dist, axis=1)
+    return indices
+
+
 def create_bovw(image, visual_vocab, patch_dim):
     """
     Funzione per creare una BoVW per l'immagine di input
     params:
         - image : immagine di cui creare la BoVW
-        - visual_vocab : vocabolario delle visual words
+        - visual_vocab : vocabolario delle visual words (lista, o matrice da stack_vocabulary
+          per non reimpilarlo a ogni immagine), oppure un indice di neighbors.create_index
         - patch_dim : dimensione delle visual words
     returns: 
         - image_bovw : BoVW dell'immagine di input
     """
-    # estrazione delle visual words dall'immagine di input
-    image_vw = []
-    for i in range(image.shape[0] // patch_dim):
-        for j in range(image.shape[1] // patch_dim):
-            image_vw.append(image[i * patch_dim : (i + 1) * patch_dim, j * patch_dim : (j + 1) * patch_dim])
-    
-    image_bovw = np.zeros((len(visual_vocab), ))   # inizializzazione BoVW
-    for vword in image_vw:
-        min_dist = float('inf')
-        min_index = -1
-        for idx, vocab_word in enumerate(visual_vocab):
-            # calcolo della visual word del vocabolario che più somiglia alla visual word 
-            # dell'immagine che vogliamo codificare
-            dist = np.sum((vword - vocab_word) ** 2)
-            if dist < min_dist:
-                min_dist = dist
-                min_index = idx
-        image_bovw[min_index] += 1  # aumento del bin della vword corrispondente
-    return image_bovw
\ No newline at end of file
+    # estrazione delle visual words dall'immagine di input e assegnazione alla più vicina
+    patches = extract_patches(image, patch_dim)
+    if hasattr(visual_vocab, 'assign'):
+        indices = visual_vocab.assign(patches)
+    else:
+        visual_vocab = stack_vocabulary(visual_vocab)
+        indices = nearest_words(patches, visual_vocab)
+    # conteggio delle visual words assegnate a ogni bin
+    return np.bincount(indices, minlength=len(visual_vocab)).astype(np.float64)
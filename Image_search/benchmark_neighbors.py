@@ -0,0 +1,91 @@
+import argparse
+import time
+
+import numpy as np
+
+from First_org import extract_patches
+from codebook import Codebook, sample_patches
+from neighbors import create_index
+
+
+def generate_images(count, size=300, seed=0):
+    """
+    Synthetic grayscale images: smoothed noise plus a random gradient and a
+    bright disc, so patches look like natural image content rather than noise
+
+    Parameters:
+    - count: Number of images
+    - size: Side of the square images
+    - seed: Random seed
+
+    Returns:
+    - List of uint8 images
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:size, :size]
+    images = []
+    for _ in range(count):
+        noise = rng.normal(size=(size, size))
+        # Box blur with cumulative sums, twice, for smooth texture
+        for _ in range(2):
+            width = int(rng.integers(3, 15))
+            kernel = np.ones(width) / width
+            noise = np.apply_along_axis(np.convolve, 0, noise, kernel, mode='same')
+            noise = np.apply_along_axis(np.convolve, 1, noise, kernel, mode='same')
+        angle = rng.uniform(0, 2 * np.pi)
+        gradient = (np.cos(angle) * x + np.sin(angle) * y) / size
+        cy, cx, radius = rng.integers(0, size, 2).tolist() + [int(rng.integers(20, 100))]
+        disc = ((y - cy) ** 2 + (x - cx) ** 2 < radius ** 2) * rng.uniform(-1, 1)
+        image = noise / noise.std() * 0.3 + gradient + disc
+        image = (image - image.min()) / (image.max() - image.min()) * 255
+        images.append(image.astype(np.uint8))
+    return images
+
+
+def histogram_fidelity(histograms, exact):
+    """Mean cosine similarity between per-image histograms and the exact ones"""
+    dots = np.sum(histograms * exact, axis=1)
+    return float(np.mean(dots / (np.linalg.norm(histograms, axis=1) * np.linalg.norm(exact, axis=1))))
+
+
+def run_benchmark(words_list, patch_dim, n_images, probes):
+    images = generate_images(n_images)
+    patches = np.concatenate([extract_patches(image, patch_dim) for image in images]).astype(np.float64)
+    per_image = len(patches) // n_images
+    print(f"{n_images} images, {len(patches):,} patches of {patch_dim}x{patch_dim}")
+
+    for n_words in words_list:
+        start = time.perf_counter()
+        words = Codebook(n_words, seed=0).fit(sample_patches(images, patch_dim, 50_000)).centers
+        print(f"\nK = {n_words} words (codebook in {time.perf_counter() - start:.1f} s)")
+
+        exact = None
+        configs = [('brute', {}), ('balltree', {})] + [('ivf', {'n_probe': n_probe}) for n_probe in probes]
+        for method, options in configs:
+            start = time.perf_counter()
+            index = create_index(words, method, **options)
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            assigned = index.assign(patches)
+            elapsed = time.perf_counter() - start
+            if exact is None:
+                exact = assigned
+                exact_histograms = np.stack([np.bincount(image_words, minlength=n_words)
+                                             for image_words in exact.reshape(n_images, per_image)])
+            histograms = np.stack([np.bincount(image_words, minlength=n_words)
+                                   for image_words in assigned.reshape(n_images, per_image)])
+            label = method + ''.join(f" {name}={value}" for name, value in options.items())
+            print(f"{label:<16} build {build:6.2f} s  {len(patches) / elapsed:12,.0f} patches/s  "
+                  f"recall {np.mean(assigned == exact):.4f}  "
+                  f"histogram cosine {histogram_fidelity(histograms, exact_histograms):.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the nearest visual word backends")
+    parser.add_argument("--words", default="256,4096", help="comma separated vocabulary sizes")
+    parser.add_argument("--patch-dim", type=int, default=10)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--probes", default="1,4,16", help="comma separated IVF n_probe values")
+    args = parser.parse_args()
+    run_benchmark([int(words) for words in args.words.split(",")], args.patch_dim, args.images,
+                  [int(n_probe) for n_probe in args.probes.split(",")])
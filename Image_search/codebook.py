@@ -0,0 +1,195 @@
+import json
+
+import numpy as np
+
+from First_org import extract_patches, nearest_words
+
+
+def sample_patches(image_set, patch_dim, max_patches=None, seed=0):
+    """
+    Funzione per estrarre (un campione del)le patch di un insieme di immagini
+    params:
+        - image_set : insieme delle immagini
+        - patch_dim : dimensione delle visual words
+        - max_patches : numero massimo di patch restituite, None per tenerle tutte
+        - seed : seme del campionamento
+    returns:
+        - patches : matrice (n_patches, patch_dim * patch_dim) in float64
+    """
+    patches = np.concatenate([extract_patches(image, patch_dim) for image in image_set]).astype(np.float64)
+    if max_patches is not None and len(patches) > max_patches:
+        rng = np.random.default_rng(seed)
+        patches = patches[np.sort(rng.choice(len(patches), max_patches, replace=False))]
+    return patches
+
+
+class Codebook:
+    def __init__(self, n_words, batch_size=1024, max_iter=100, tol=1e-4, patience=10, seed=0):
+        """
+        Costruttore della classe Codebook: vocabolario di n_words visual words
+        appreso con k-means mini-batch (Sculley, 2010) sulle patch campionate
+        params:
+            - n_words : numero di visual words (K), indipendente dal numero di immagini
+            - batch_size : patch per ogni passo di aggiornamento
+            - max_iter : numero massimo di passate sui dati in fit
+            - tol : arresto anticipato quando lo spostamento dei centri scende sotto
+              tol volte la varianza media dei dati
+            - patience : arresto anticipato dopo tanti batch senza miglioramento
+              dell'inerzia media
+            - seed : seme per l'inizializzazione k-means++ e per i batch
+        """
+        self.n_words = n_words
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.patience = patience
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.centers = None     # matrice (K, d) delle visual words
+        self.counts = None      # patch assegnate finora a ogni centro, danno il passo di apprendimento
+        self.n_steps = 0
+
+    def _init_centers(self, patches):
+        # inizializzazione k-means++: ogni nuovo centro è scelto con probabilità
+        # proporzionale alla distanza al quadrato dal centro più vicino
+        if len(patches) < self.n_words:
+            raise ValueError(f"Servono almeno {self.n_words} patch per inizializzare il codebook, "
+                             f"ricevute {len(patches)}")
+        sample = patches[self.rng.choice(len(patches), min(len(patches), max(3 * self.n_words, self.batch_size)),
+                                         replace=False)]
+        centers = np.empty((self.n_words, sample.shape[1]))
+        centers[0] = sample[self.rng.integers(len(sample))]
+        closest = np.sum((sample - centers[0]) ** 2, axis=1)
+        for k in range(1, self.n_words):
+            total = closest.sum()
+            # tutte le patch coincidono con un centro: si sceglie a caso
+            index = self.rng.choice(len(sample), p=closest / total) if total > 0 else self.rng.integers(len(sample))
+            centers[k] = sample[index]
+            closest = np.minimum(closest, np.sum((sample - centers[k]) ** 2, axis=1))
+        self.centers = centers
+        self.counts = np.zeros(self.n_words, dtype=np.int64)
+
+    def _step(self, batch):
+        """
+        Un passo di k-means mini-batch: ogni centro si sposta verso la media
+        delle sue patch del batch con passo 1 / (patch viste dal centro)
+        returns:
+            - inertia : distanza al quadrato media delle patch dal centro assegnato
+            - shift : spostamento al quadrato totale dei centri
+        """
+        labels = nearest_words(batch, self.centers)
+        inertia = np.mean(np.sum((batch - self.centers[labels]) ** 2, axis=1))
+
+        # somma delle patch di ogni centro con un ordinamento e una reduceat
+        order = np.argsort(labels, kind='stable')
+        labels = labels[order]
+        starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+        words = labels[starts]
+        sizes = np.diff(np.append(starts, len(labels)))
+        sums = np.add.reduceat(batch[order], starts, axis=0)
+
+        self.counts[words] += sizes
+        old = self.centers[words]
+        self.centers[words] = old + (sums - sizes[:, None] * old) / self.counts[words][:, None]
+        self.n_steps += 1
+        return inertia, np.sum((self.centers[words] - old) ** 2)
+
+    def fit(self, patches):
+        """
+        Funzione per apprendere il codebook da zero
+        params:
+            - patches : matrice (n_patches, d) di patch, ad esempio da sample_patches
+        returns:
+            - self
+        """
+        patches = np.asarray(patches, dtype=np.float64)
+        self._init_centers(patches)
+        n_batches = max(1, -(-len(patches) // self.batch_size))
+        shift_limit = self.tol * np.mean(np.var(patches, axis=0))
+        ewa_inertia, best_inertia, no_improvement = None, np.inf, 0
+        # l'inerzia di ogni batch è rumorosa: si segue una media mobile esponenziale
+        alpha = min(1.0, 2 * self.batch_size / (len(patches) + 1))
+        for _ in range(self.max_iter * n_batches):
+            batch = patches[self.rng.choice(len(patches), min(self.batch_size, len(patches)), replace=False)]
+            inertia, shift = self._step(batch)
+            ewa_inertia = inertia if ewa_inertia is None else (1 - alpha) * ewa_inertia + alpha * inertia
+
+            # arresto anticipato: centri fermi o inerzia che non migliora da patience batch
+            if shift <= shift_limit:
+                break
+            if ewa_inertia < best_inertia:
+                best_inertia, no_improvement = ewa_inertia, 0
+            else:
+                no_improvement += 1
+                if no_improvement >= self.patience:
+                    break
+        return self
+
+    def partial_fit(self, patches):
+        """
+        Funzione per aggiornare il codebook con nuove patch (ad esempio di nuove
+        immagini) senza ripartire da zero; al primo uso inizializza i centri
+        params:
+            - patches : matrice (n_patches, d) di nuove patch
+        returns:
+            - self
+        """
+        patches = np.asarray(patches, dtype=np.float64)
+        if self.centers is None:
+            self._init_centers(patches)
+        for start in range(0, len(patches), self.batch_size):
+            self._step(patches[start:start + self.batch_size])
+        return self
+
+    def predict(self, patches):
+        """Indice della visual word più vicina per ogni patch"""
+        return nearest_words(patches, self.centers)
+
+    def save(self, path):
+        """
+        Funzione per salvare il codebook su disco (file .npz)
+        params:
+            - path : percorso del file
+        """
+        config = {'n_words': self.n_words, 'batch_size': self.batch_size, 'max_iter': self.max_iter,
+                  'tol': self.tol, 'patience': self.patience, 'seed': self.seed, 'n_steps': self.n_steps}
+        np.savez(path, centers=self.centers, counts=self.counts, config=np.array(json.dumps(config)))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Funzione per caricare un codebook salvato con save; partial_fit può
+        continuare ad aggiornarlo
+        params:
+            - path : percorso del file
+        returns:
+            - codebook : il Codebook caricato
+        """
+        with np.load(path) as data:
+            config = json.loads(str(data['config']))
+            n_steps = config.pop('n_steps')
+            codebook = cls(**config)
+            codebook.centers = data['centers']
+            codebook.counts = data['counts']
+        codebook.n_steps = n_steps
+        return codebook
+
+
+def create_codebook(image_set, patch_dim, n_words, max_patches=100_000, seed=0, path=None):
+    """
+    Funzione per creare un vocabolario di dimensione fissa con k-means, in
+    alternativa a create_visual_vocabulary (una visual word per patch)
+    params:
+        - image_set : insieme rappresentativo delle immagini
+        - patch_dim : dimensione delle visual words
+        - n_words : numero di visual words del vocabolario
+        - max_patches : patch campionate per l'apprendimento
+        - seed : seme del campionamento e di k-means
+        - path : se indicato, il codebook viene salvato in questo file
+    returns:
+        - codebook : Codebook appreso; codebook.centers si passa a create_bovw come visual_vocab
+    """
+    codebook = Codebook(n_words, seed=seed).fit(sample_patches(image_set, patch_dim, max_patches, seed))
+    if path is not None:
+        codebook.save(path)
+    return codebook
@@ -0,0 +1,235 @@
+import numpy as np
+
+# i pesi TF-IDF delle postings vengono ricalcolati quando il numero di immagini
+# è cresciuto o calato di questo fattore dall'ultimo calcolo
+REWEIGHT_GROWTH = 1.25
+# le immagini cancellate vengono rimosse (postings e dati per immagine) quando le loro
+# postings o il loro numero superano questa frazione del totale
+COMPACT_FRACTION = 0.25
+# postings sommate per volta da reweight
+REWEIGHT_BATCH = 1 << 22
+
+
+def _grow(array, size):
+    # capacità raddoppiata, per inserimenti ammortizzati in tempo costante
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class InvertedIndex:
+    def __init__(self, n_words):
+        """
+        Indice invertito sulle BoVW: per ogni visual word la lista (posting) delle
+        immagini che la contengono, con la frequenza tf e il peso TF-IDF già
+        normalizzato, tf * idf / ||tf * idf|| dell'immagine. Una query legge solo le
+        postings delle sue parole non nulle e il prodotto dei pesi dà la cosine
+        similarity dei vettori TF-IDF. idf = log((1 + N) / (1 + df)) + 1, con N
+        immagini e df immagini che contengono la parola. Le BoVW nulle non hanno
+        postings e non vengono indicizzate
+        params:
+            - n_words : dimensione del vocabolario (lunghezza delle BoVW)
+        """
+        self.n_words = n_words
+        self.ids = []               # identificativo esterno di ogni immagine, per indice interno
+        self.positions = {}         # identificativo esterno -> indice interno, solo immagini presenti
+        self.alive = np.zeros(0, dtype=bool)
+        self.norms = np.zeros(0)    # norma TF-IDF di ogni immagine all'ultimo calcolo dei pesi
+        self.doc_words = []         # parole non nulle di ogni immagine, servono alla cancellazione
+        self.df = np.zeros(n_words, dtype=np.int64)
+        # postings di ogni parola come liste di blocchi (immagini, tf, pesi), unite alla lettura
+        self.postings = [[] for _ in range(n_words)]
+        self.n_postings = 0
+        self.dead_postings = 0
+        self.weighted_count = 0     # numero di immagini all'ultimo calcolo dei pesi
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, image_id):
+        return image_id in self.positions
+
+    def idf(self):
+        """Pesi idf correnti di tutte le parole"""
+        return np.log((1 + len(self)) / (1 + self.df)) + 1
+
+    def add(self, image_id, bovw):
+        """Inserisce un'immagine con la sua BoVW"""
+        self.add_many([image_id], np.asarray(bovw, dtype=np.float64).reshape(1, -1))
+
+    def add_many(self, image_ids, bovws):
+        """
+        Inserisce più immagini insieme, raggruppando le postings per parola
+        params:
+            - image_ids : identificativi delle immagini (ad esempio i nomi dei file)
+            - bovws : matrice (n_immagini, n_words) o lista di BoVW
+        """
+        bovws = np.asarray(bovws, dtype=np.float64)
+        if bovws.ndim != 2 or bovws.shape != (len(image_ids), self.n_words):
+            raise ValueError(f"Attese {len(image_ids)} BoVW di lunghezza {self.n_words}, ricevuta forma {bovws.shape}")
+        for image_id in image_ids:
+            if image_id in self.positions:
+                raise ValueError(f"Immagine già presente nell'indice: {image_id}")
+        if len(set(image_ids)) != len(image_ids):
+            raise ValueError("Identificativi ripetuti fra le immagini da inserire")
+        # le BoVW nulle non danno postings: si scartano prima di toccare lo stato dell'indice
+        nonzero = np.flatnonzero(bovws.any(axis=1))
+        if len(nonzero) < len(image_ids):
+            image_ids = [image_ids[i] for i in nonzero]
+            bovws = bovws[nonzero]
+        if not len(image_ids):
+            return
+
+        first = len(self.ids)
+        for offset, image_id in enumerate(image_ids):
+            self.positions[image_id] = first + offset
+        self.ids.extend(image_ids)
+        self.alive = _grow(self.alive, len(self.ids))
+        self.alive[first:len(self.ids)] = True
+        self.norms = _grow(self.norms, len(self.ids))
+
+        rows, words = np.nonzero(bovws)
+        tf = bovws[rows, words]
+        docs = rows + first
+        np.add.at(self.df, words, 1)
+        self.n_postings += len(docs)
+        starts = np.searchsorted(rows, np.arange(len(image_ids) + 1))
+        self.doc_words.extend(words[starts[i]:starts[i + 1]].astype(np.int32) for i in range(len(image_ids)))
+
+        if len(self) > self.weighted_count * REWEIGHT_GROWTH:
+            # molte immagini nuove: gli idf sono cambiati, si ricalcolano tutti i pesi
+            self._append(docs, words, tf, np.zeros(len(tf)))
+            self.reweight()
+            return
+        # altrimenti le nuove immagini sono pesate con gli idf correnti
+        weighted = tf * self.idf()[words]
+        norms = np.sqrt(np.bincount(rows, weights=weighted ** 2, minlength=len(image_ids)))
+        self.norms[first:len(self.ids)] = norms
+        self._append(docs, words, tf, weighted / norms[rows])
+
+    def _append(self, docs, words, tf, weights):
+        # un blocco per ogni parola toccata, con un solo ordinamento
+        if not len(docs):
+            return
+        order = np.argsort(words, kind='stable')
+        words = words[order]
+        bounds = np.flatnonzero(np.concatenate(([True], words[1:] != words[:-1], [True])))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            part = order[start:end]
+            self.postings[words[start]].append((docs[part], tf[part].astype(np.float32),
+                                                weights[part].astype(np.float32)))
+
+    def _posting(self, word):
+        """(immagini, tf, pesi) della parola, con i blocchi uniti in uno solo"""
+        blocks = self.postings[word]
+        if not blocks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        if len(blocks) > 1:
+            blocks[:] = [tuple(np.concatenate(parts) for parts in zip(*blocks))]
+        return blocks[0]
+
+    def remove(self, image_id):
+        """Cancella un'immagine; le sue postings restano fino alla prossima compattazione"""
+        position = self.positions.pop(image_id, None)
+        if position is None:
+            raise KeyError(image_id)
+        self.alive[position] = False
+        words = self.doc_words[position]
+        self.df[words] -= 1
+        self.dead_postings += len(words)
+        self.doc_words[position] = words[:0]
+        if (self.dead_postings > COMPACT_FRACTION * self.n_postings
+                or len(self.ids) - len(self) > COMPACT_FRACTION * len(self.ids)):
+            self.compact()
+        if len(self) * REWEIGHT_GROWTH < self.weighted_count:
+            self.reweight()
+
+    def compact(self):
+        """
+        Rimuove le immagini cancellate dalle postings e dai dati per immagine
+        (identificativi, norme, parole), rinumerando le immagini presenti; la
+        memoria torna proporzionale alle sole immagini presenti
+        """
+        live = np.flatnonzero(self.alive[:len(self.ids)])
+        renumber = np.zeros(len(self.ids), dtype=np.int64)
+        renumber[live] = np.arange(len(live))
+        for word in range(self.n_words):
+            if self.postings[word]:
+                docs, tf, weights = self._posting(word)
+                keep = self.alive[docs]
+                self.postings[word] = [(renumber[docs[keep]], tf[keep], weights[keep])] if keep.any() else []
+        self.ids = [self.ids[position] for position in live]
+        self.positions = {image_id: position for position, image_id in enumerate(self.ids)}
+        self.doc_words = [self.doc_words[position] for position in live]
+        self.alive = np.ones(len(live), dtype=bool)
+        self.norms = self.norms[live]
+        self.n_postings -= self.dead_postings
+        self.dead_postings = 0
+
+    def reweight(self):
+        """Ricalcola i pesi TF-IDF normalizzati di tutte le postings con gli idf correnti"""
+        idf = self.idf()
+        squares = np.zeros(len(self.ids))
+        # somme per immagine con un bincount ogni REWEIGHT_BATCH postings, non uno per parola
+        docs_parts, square_parts, pending = [], [], 0
+        for word in range(self.n_words):
+            if self.postings[word]:
+                docs, tf, _ = self._posting(word)
+                docs_parts.append(docs)
+                square_parts.append((tf * idf[word]) ** 2)
+                pending += len(docs)
+            if pending >= REWEIGHT_BATCH or (word == self.n_words - 1 and pending):
+                squares += np.bincount(np.concatenate(docs_parts), weights=np.concatenate(square_parts),
+                                       minlength=len(self.ids))
+                docs_parts, square_parts, pending = [], [], 0
+        self.norms[:len(self.ids)] = np.sqrt(squares)
+        norms = np.where(self.norms > 0, self.norms, 1)
+        for word in range(self.n_words):
+            if self.postings[word]:
+                docs, tf, _ = self._posting(word)
+                self.postings[word] = [(docs, tf, (tf * idf[word] / norms[docs]).astype(np.float32))]
+        self.weighted_count = len(self)
+
+    def query(self, bovw, top_k=3):
+        """
+        Funzione per trovare le immagini più simili a una BoVW
+        params:
+            - bovw : BoVW della query
+            - top_k : numero di immagini restituite
+        returns:
+            - lista di (identificativo, similarità) ordinata per similarità decrescente
+        """
+        bovw = np.asarray(bovw, dtype=np.float64)
+        words = np.flatnonzero(bovw)
+        if not len(words) or not len(self):
+            return []
+        query = bovw[words] * self.idf()[words]
+        query /= np.linalg.norm(query)
+
+        # solo le postings delle parole della query
+        parts = [self._posting(word) for word in words]
+        docs = np.concatenate([docs for docs, _, _ in parts])
+        contributions = np.concatenate([weights * weight for (_, _, weights), weight in zip(parts, query)])
+        if not len(docs):
+            return []
+        if len(docs) > len(self.ids) // 4:
+            # molti candidati (parole comuni): un accumulatore denso costa meno di un ordinamento
+            scores = np.bincount(docs, weights=contributions, minlength=len(self.ids))
+            docs = np.flatnonzero(scores)
+            scores = scores[docs]
+        else:
+            order = np.argsort(docs, kind='stable')
+            docs = docs[order]
+            starts = np.flatnonzero(np.concatenate(([True], docs[1:] != docs[:-1])))
+            docs, scores = docs[starts], np.add.reduceat(contributions[order], starts)
+        live = self.alive[docs]
+        docs, scores = docs[live], scores[live]
+
+        # selezione dei top_k senza ordinare tutti i candidati
+        if len(docs) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            docs, scores = docs[best], scores[best]
+        order = np.lexsort((docs, -scores))
+        return [(self.ids[doc], float(score)) for doc, score in zip(docs[order], scores[order])]
@@ -0,0 +1,212 @@
+import numpy as np
+
+from First_org import nearest_words, stack_vocabulary
+
+# Patch elaborate per volta da assign, limita le matrici temporanee
+BATCH_SIZE = 4096
+# Margine relativo sulle distanze dei lower bound, perché gli arrotondamenti non scartino il vicino vero
+BOUND_SLACK = 1e-9
+
+
+def _squared_distances(patches, patches_sq, words, words_sq):
+    # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab come in nearest_words
+    return patches_sq[:, None] + words_sq[None, :] - 2 * patches @ words.T
+
+
+def _update_best(best_dist, best_word, rows, dist, word_ids):
+    """
+    Aggiorna per le righe rows il vicino migliore con le distanze dist verso
+    le parole word_ids; a parità vince l'indice minore, come argmin in nearest_words
+    """
+    local = np.argmin(dist, axis=1)
+    candidate_dist = dist[np.arange(len(rows)), local]
+    candidate_word = word_ids[local]
+    better = (candidate_dist < best_dist[rows]) | ((candidate_dist == best_dist[rows]) &
+                                                   (candidate_word < best_word[rows]))
+    best_dist[rows[better]] = candidate_dist[better]
+    best_word[rows[better]] = candidate_word[better]
+
+
+class BruteForceIndex:
+    def __init__(self, visual_vocab):
+        """
+        Indice esatto a scansione completa (nearest_words): il più rapido per
+        vocabolari piccoli, dove il prodotto matriciale costa poco
+        params:
+            - visual_vocab : lista di visual words o matrice (K, d)
+        """
+        self.words = stack_vocabulary(visual_vocab)
+
+    def __len__(self):
+        return len(self.words)
+
+    def assign(self, patches):
+        """Indice della visual word più vicina per ogni patch"""
+        return nearest_words(patches, self.words, BATCH_SIZE)
+
+
+class BallTreeIndex:
+    def __init__(self, visual_vocab, leaf_size=256):
+        """
+        Indice esatto ad albero di sfere: le parole sono divise ricorsivamente
+        lungo la direzione fra due punti lontani finché ogni foglia ne ha al più
+        leaf_size; ogni foglia è una sfera (centro, raggio). Una patch visita le
+        foglie per lower bound crescente (distanza dal centro meno il raggio) e si
+        ferma quando il bound supera la distanza migliore trovata
+        params:
+            - visual_vocab : lista di visual words o matrice (K, d)
+            - leaf_size : numero massimo di parole per foglia
+        """
+        self.words = stack_vocabulary(visual_vocab)
+        self.words_sq = np.einsum('ij,ij->i', self.words, self.words)
+        self.leaves = []
+        self._split(np.arange(len(self.words)), leaf_size)
+        self.leaf_centers = np.stack([self.words[leaf].mean(axis=0) for leaf in self.leaves])
+        self.leaf_radii = np.array([np.sqrt(np.max(np.sum((self.words[leaf] - center) ** 2, axis=1)))
+                                    for leaf, center in zip(self.leaves, self.leaf_centers)])
+        self.leaf_centers_sq = np.einsum('ij,ij->i', self.leaf_centers, self.leaf_centers)
+
+    def _split(self, ids, leaf_size):
+        # divisione iterativa (niente ricorsione profonda) in due metà per mediana della proiezione
+        stack = [ids]
+        while stack:
+            ids = stack.pop()
+            points = self.words[ids]
+            if len(ids) <= leaf_size:
+                # in ordine, perché a parità di distanza vinca l'indice minore
+                self.leaves.append(np.sort(ids))
+                continue
+            first = points[np.argmax(np.sum((points - points.mean(axis=0)) ** 2, axis=1))]
+            second = points[np.argmax(np.sum((points - first) ** 2, axis=1))]
+            projection = points @ (second - first)
+            order = np.argsort(projection, kind='stable')
+            half = len(ids) // 2
+            stack.extend([ids[order[half:]], ids[order[:half]]])
+
+    def __len__(self):
+        return len(self.words)
+
+    def assign(self, patches):
+        """Indice della visual word più vicina per ogni patch (risultato esatto)"""
+        indices = np.empty(len(patches), dtype=np.int64)
+        for start in range(0, len(patches), BATCH_SIZE):
+            indices[start:start + BATCH_SIZE] = self._assign_batch(patches[start:start + BATCH_SIZE].astype(np.float64))
+        return indices
+
+    def _assign_batch(self, batch):
+        batch_sq = np.einsum('ij,ij->i', batch, batch)
+        center_dist = np.sqrt(np.maximum(_squared_distances(batch, batch_sq, self.leaf_centers,
+                                                            self.leaf_centers_sq), 0))
+        slack = BOUND_SLACK * (center_dist + self.leaf_radii)
+        bounds = np.maximum(center_dist - self.leaf_radii - slack, 0) ** 2
+        order = np.argsort(bounds, axis=1)
+        best_dist = np.full(len(batch), np.inf)
+        best_word = np.full(len(batch), len(self.words), dtype=np.int64)
+
+        # a ogni giro ogni patch ancora aperta visita la sua prossima foglia più promettente
+        for visit in range(len(self.leaves)):
+            leaf_of = order[:, visit]
+            open_rows = np.flatnonzero(bounds[np.arange(len(batch)), leaf_of] <= best_dist)
+            if not len(open_rows):
+                break
+            for leaf in np.unique(leaf_of[open_rows]):
+                rows = open_rows[leaf_of[open_rows] == leaf]
+                ids = self.leaves[leaf]
+                dist = _squared_distances(batch[rows], batch_sq[rows], self.words[ids], self.words_sq[ids])
+                _update_best(best_dist, best_word, rows, dist, ids)
+        return best_word
+
+
+class IVFIndex:
+    def __init__(self, visual_vocab, n_lists=None, n_probe=8, seed=0):
+        """
+        Indice approssimato a file invertiti (IVF): le parole sono raggruppate
+        con k-means in n_lists liste; una patch confronta solo le parole delle
+        n_probe liste col centroide più vicino. n_probe regola il compromesso:
+        più liste visitate, recall più alto e assegnazione più lenta
+        params:
+            - visual_vocab : lista di visual words o matrice (K, d)
+            - n_lists : numero di liste, default circa 4 * sqrt(K)
+            - n_probe : liste visitate per patch (n_probe = n_lists dà il risultato esatto)
+            - seed : seme di k-means
+        """
+        from codebook import Codebook
+
+        self.words = stack_vocabulary(visual_vocab)
+        self.words_sq = np.einsum('ij,ij->i', self.words, self.words)
+        self.n_lists = min(n_lists or max(1, int(4 * np.sqrt(len(self.words)))), len(self.words))
+        self.n_probe = n_probe
+        quantizer = Codebook(self.n_lists, batch_size=min(1024, len(self.words)), seed=seed).fit(self.words)
+        self.list_centers = quantizer.centers
+        self.list_centers_sq = np.einsum('ij,ij->i', self.list_centers, self.list_centers)
+        labels = quantizer.predict(self.words)
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(self.n_lists + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+
+    def __len__(self):
+        return len(self.words)
+
+    def assign(self, patches, n_probe=None):
+        """
+        Indice della visual word (approssimativamente) più vicina per ogni patch
+        params:
+            - patches : matrice (n_patches, d)
+            - n_probe : liste visitate per patch, default quello del costruttore
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        indices = np.empty(len(patches), dtype=np.int64)
+        for start in range(0, len(patches), BATCH_SIZE):
+            batch = patches[start:start + BATCH_SIZE].astype(np.float64)
+            indices[start:start + BATCH_SIZE] = self._assign_batch(batch, n_probe)
+        return indices
+
+    def _assign_batch(self, batch, n_probe):
+        batch_sq = np.einsum('ij,ij->i', batch, batch)
+        coarse = _squared_distances(batch, batch_sq, self.list_centers, self.list_centers_sq)
+        probes = np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe] if n_probe < self.n_lists else None
+        best_dist = np.full(len(batch), np.inf)
+        best_word = np.full(len(batch), len(self.words), dtype=np.int64)
+
+        # lista per lista: un solo prodotto matriciale con tutte le patch che la visitano
+        probed = np.zeros((len(batch), self.n_lists), dtype=bool)
+        if probes is None:
+            probed[:] = True
+        else:
+            probed[np.arange(len(batch))[:, None], probes] = True
+        for list_id, ids in enumerate(self.lists):
+            rows = np.flatnonzero(probed[:, list_id])
+            if not len(rows) or not len(ids):
+                continue
+            dist = _squared_distances(batch[rows], batch_sq[rows], self.words[ids], self.words_sq[ids])
+            _update_best(best_dist, best_word, rows, dist, ids)
+        return best_word
+
+
+# scelte di method='auto': scansione completa fino a AUTO_BRUTE_WORDS parole, albero di sfere
+# (esatto) fino a AUTO_EXACT_WORDS, IVF oltre
+AUTO_BRUTE_WORDS = 1024
+AUTO_EXACT_WORDS = 8192
+
+BACKENDS = {'brute': BruteForceIndex, 'balltree': BallTreeIndex, 'ivf': IVFIndex}
+
+
+def create_index(visual_vocab, method='auto', **options):
+    """
+    Funzione per costruire una volta per vocabolario l'indice usato da create_bovw
+    params:
+        - visual_vocab : lista di visual words o matrice (K, d), ad esempio codebook.centers
+        - method : 'brute', 'balltree' (esatti), 'ivf' (approssimato) o 'auto', che
+          sceglie in base al numero di parole (AUTO_BRUTE_WORDS, AUTO_EXACT_WORDS)
+        - options : parametri del backend (leaf_size, n_lists, n_probe, seed)
+    returns:
+        - index : oggetto con assign(patches); si passa a create_bovw al posto del vocabolario
+    """
+    if method == 'auto':
+        if len(visual_vocab) <= AUTO_BRUTE_WORDS:
+            method = 'brute'
+        else:
+            method = 'balltree' if len(visual_vocab) <= AUTO_EXACT_WORDS else 'ivf'
+    if method not in BACKENDS:
+        raise ValueError(f"Metodo sconosciuto: {method}, atteso uno fra {', '.join(BACKENDS)} o auto")
+    return BACKENDS[method](visual_vocab, **options)
@@ -0,0 +1,153 @@
+import numpy as np
+
+# righe del database moltiplicate per volta: limita la matrice delle similarità a query_batch x BLOCK_SIZE
+BLOCK_SIZE = 65536
+# query elaborate insieme da top_k
+QUERY_BATCH = 1024
+
+
+def normalize_rows(vectors, dtype=np.float32):
+    """
+    Funzione per normalizzare in L2 le righe di una matrice
+    params:
+        - vectors : matrice (n, d) o lista di vettori
+        - dtype : tipo del risultato
+    returns:
+        - matrice (n, d) con righe di norma 1; le righe nulle restano nulle (similarità 0)
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1)).astype(dtype)
+
+
+def _merge_top_k(best_scores, best_indices, scores, indices, k):
+    # unione dei top k correnti con quelli di un nuovo blocco, riga per riga
+    scores = np.concatenate((best_scores, scores), axis=1)
+    indices = np.concatenate((best_indices, indices), axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        indices = np.take_along_axis(indices, keep, axis=1)
+    return scores, indices
+
+
+class SimilarityEngine:
+    def __init__(self, vectors, block_size=BLOCK_SIZE, normalized=False, dtype=np.float32):
+        """
+        Motore di similarità coseno: i vettori (ad esempio le BoVW) sono
+        impilati in una matrice con righe normalizzate, così la similarità è un
+        prodotto matriciale fatto a blocchi di righe. La matrice può essere un
+        np.memmap su disco (vedi create_memmap/open): si legge un blocco per volta
+        e il database non deve stare in RAM
+        params:
+            - vectors : matrice (n, d) o lista di vettori
+            - block_size : righe del database moltiplicate per volta
+            - normalized : True se le righe di vectors sono già normalizzate (nessuna copia)
+            - dtype : tipo della matrice e delle similarità; float32 dimezza memoria e
+              letture ma può cambiare l'ultima cifra rispetto al calcolo in float64
+        """
+        self.matrix = vectors if normalized else normalize_rows(vectors, dtype)
+        self.dtype = self.matrix.dtype
+        self.block_size = block_size
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @classmethod
+    def create_memmap(cls, path, vectors, count, dim, block_size=BLOCK_SIZE, dtype=np.float32):
+        """
+        Funzione per scrivere su disco (file .npy) i vettori normalizzati, un
+        blocco per volta, per collezioni più grandi della RAM
+        params:
+            - path : file .npy da creare
+            - vectors : iterabile di vettori o di matrici di vettori
+            - count : numero totale di vettori
+            - dim : dimensione dei vettori
+            - block_size : righe normalizzate e scritte per volta
+            - dtype : tipo dei valori nel file
+        returns:
+            - SimilarityEngine sul file memory-mapped
+        """
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(count, dim))
+        written, pending, pending_rows = 0, [], 0
+        for item in vectors:
+            item = np.asarray(item, dtype=np.float64).reshape(-1, dim)
+            pending.append(item)
+            pending_rows += len(item)
+            if pending_rows >= block_size:
+                block = normalize_rows(np.concatenate(pending), dtype)
+                matrix[written:written + len(block)] = block
+                written, pending, pending_rows = written + len(block), [], 0
+        if pending:
+            block = normalize_rows(np.concatenate(pending), dtype)
+            matrix[written:written + len(block)] = block
+            written += len(block)
+        if written != count:
+            raise ValueError(f"Attesi {count} vettori, ricevuti {written}")
+        matrix.flush()
+        return cls(matrix, block_size, normalized=True)
+
+    @classmethod
+    def open(cls, path, block_size=BLOCK_SIZE):
+        """Apre in sola lettura un file scritto da create_memmap"""
+        return cls(np.load(path, mmap_mode='r'), block_size, normalized=True)
+
+    def _blocks(self):
+        for start in range(0, len(self.matrix), self.block_size):
+            yield start, np.asarray(self.matrix[start:start + self.block_size])
+
+    def similarities(self, queries):
+        """
+        Funzione per calcolare tutte le similarità fra query e database
+        params:
+            - queries : matrice (q, d) o singolo vettore
+        returns:
+            - matrice (q, n) delle similarità coseno
+        """
+        return self._scores(normalize_rows(queries, self.dtype))
+
+    def pairwise(self):
+        """Matrice (n, n) delle similarità coseno fra tutti i vettori del database"""
+        result = np.empty((len(self.matrix), len(self.matrix)), dtype=self.dtype)
+        for start, block in self._blocks():
+            # le righe del database sono già normalizzate
+            result[start:start + len(block)] = self._scores(block)
+        return result
+
+    def _scores(self, queries):
+        result = np.empty((len(queries), len(self.matrix)), dtype=self.dtype)
+        for start, block in self._blocks():
+            result[:, start:start + len(block)] = queries @ block.T
+        return result
+
+    def top_k(self, queries, k=3, query_batch=QUERY_BATCH):
+        """
+        Funzione per trovare i k vettori più simili a ogni query senza ordinare
+        tutto il database: per ogni blocco si tengono i k migliori con argpartition
+        params:
+            - queries : matrice (q, d) o singolo vettore
+            - k : numero di risultati per query
+            - query_batch : query moltiplicate insieme per ogni blocco
+        returns:
+            - indices : matrice (q, k) degli indici nel database, per similarità decrescente
+            - scores : matrice (q, k) delle similarità corrispondenti
+        """
+        queries = normalize_rows(queries, self.dtype)
+        k = min(k, len(self.matrix))
+        all_indices = np.empty((len(queries), k), dtype=np.int64)
+        all_scores = np.empty((len(queries), k), dtype=self.dtype)
+        for query_start in range(0, len(queries), query_batch):
+            batch = queries[query_start:query_start + query_batch]
+            best_scores = np.empty((len(batch), 0), dtype=self.dtype)
+            best_indices = np.empty((len(batch), 0), dtype=np.int64)
+            for start, block in self._blocks():
+                scores = batch @ block.T
+                indices = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+                best_scores, best_indices = _merge_top_k(best_scores, best_indices, scores, indices, k)
+            # ordine finale: similarità decrescente, a parità indice crescente
+            order = np.lexsort((best_indices, -best_scores), axis=1)
+            all_indices[query_start:query_start + len(batch)] = np.take_along_axis(best_indices, order, axis=1)
+            all_scores[query_start:query_start + len(batch)] = np.take_along_axis(best_scores, order, axis=1)
+        return all_indices, all_scores
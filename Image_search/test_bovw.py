@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 from PIL import Image
 import os
 from First_org import create_visual_vocabulary, create_bovw
+from similarity import SimilarityEngine
 
 def load_and_preprocess_images(image_dir, target_size=(300, 300)):
     """
@@ -116,15 +117,11 @@ def main():
     
     # Calculate similarity between images using BoVW
     print("\nSimilarity between images (cosine similarity):")
-    for i in range(len(bovw_vectors)):
-        for j in range(i+1, len(bovw_vectors)):
-            # Normalize vectors
-            norm_i = bovw_vectors[i] / np.linalg.norm(bovw_vectors[i])
-            norm_j = bovw_vectors[j] / np.linalg.norm(bovw_vectors[j])
-            
-            # Calculate cosine similarity
-            similarity = np.dot(norm_i, norm_j)
-            print(f"Similarity between image {i+1} and image {j+1}: {similarity:.4f}")
+    # Vectors are normalized once and all pairs come from one blocked matrix product,
+    # in float64 like the per-pair computation so the printed values do not change
+    similarities = SimilarityEngine(bovw_vectors, dtype=np.float64).pairwise()
+    for i, j in zip(*np.triu_indices(len(bovw_vectors), k=1)):
+        print(f"Similarity between image {i+1} and image {j+1}: {similarities[i, j]:.4f}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
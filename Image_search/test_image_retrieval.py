@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 from PIL import Image
 import os
 from First_org import create_visual_vocabulary, create_bovw
+from inverted_index import InvertedIndex
 
 def load_and_preprocess_images(image_dir, target_size=(300, 300)):
     """
@@ -38,38 +39,50 @@ def load_and_preprocess_images(image_dir, target_size=(300, 300)):
     
     return images, image_paths, filenames
 
-def retrieve_similar_images(query_bovw, database_bovws, filenames, top_k=3):
+def build_retrieval_index(database_bovws, filenames):
     """
-    Retrieve the most similar images to the query image
+    Build the inverted TF-IDF index used by retrieve_similar_images
     
     Parameters:
-    - query_bovw: BoVW of the query image
     - database_bovws: List of BoVWs for all images in the database
     - filenames: List of filenames corresponding to database_bovws
-    - top_k: Number of most similar images to retrieve
     
     Returns:
-    - List of (filename, similarity) tuples for the top_k most similar images
+    - InvertedIndex over the database, keyed by filename
     """
-    similarities = []
+    index = InvertedIndex(len(database_bovws[0]))
+    index.add_many(filenames, np.stack(database_bovws))
+    return index
+
+def retrieve_similar_images(query_bovw, database_bovws, filenames=None, top_k=3):
+    """
+    Retrieve the most similar images to the query image
     
-    # Normalize query vector
-    query_norm = query_bovw / np.linalg.norm(query_bovw)
+    Parameters:
+    - query_bovw: BoVW of the query image
+    - database_bovws: InvertedIndex from build_retrieval_index, where only the
+      postings of the query's visual words are read, or the list of BoVWs for
+      all images in the database
+    - filenames: List of filenames corresponding to database_bovws (not needed
+      with an InvertedIndex, which is keyed by filename)
+    - top_k: Number of most similar images to retrieve
     
-    # Calculate similarity with each database image
-    for i, db_bovw in enumerate(database_bovws):
-        # Normalize database vector
-        db_norm = db_bovw / np.linalg.norm(db_bovw)
-        
-        # Calculate cosine similarity
-        similarity = np.dot(query_norm, db_norm)
-        similarities.append((filenames[i], similarity))
+    Returns:
+    - List of (filename, similarity) tuples for the top_k most similar images,
+      by cosine similarity of the TF-IDF weighted BoVWs with an InvertedIndex,
+      of the raw BoVWs with a list
+    """
+    if isinstance(database_bovws, InvertedIndex):
+        return database_bovws.query(query_bovw, top_k)
     
-    # Sort by similarity (descending)
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    # Normalize the vectors, then all cosine similarities with one matrix product
+    database = np.stack(database_bovws).astype(np.float64)
+    database /= np.linalg.norm(database, axis=1, keepdims=True)
+    similarities = database @ (query_bovw / np.linalg.norm(query_bovw))
     
-    # Return top_k most similar images
-    return similarities[:top_k]
+    # Sort by similarity (descending), ties in database order
+    best = np.argsort(-similarities, kind='stable')[:top_k]
+    return [(filenames[i], similarities[i]) for i in best]
 
 def visualize_retrieval_results(query_image_path, results, image_dir):
     """
@@ -135,8 +148,9 @@ def main():
     
     print(f"\nUsing image {query_image_index + 1} as query")
     
-    # Retrieve similar images
-    results = retrieve_similar_images(query_bovw, bovw_vectors, filenames)
+    # Index the database once, then retrieve similar images
+    index = build_retrieval_index(bovw_vectors, filenames)
+    results = retrieve_similar_images(query_bovw, index)
     
     print("\nRetrieval results:")
     for filename, similarity in results:
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from inverted_index import InvertedIndex
+
+
+def random_bovws(count, n_words, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.poisson(0.5, (count, n_words)).astype(np.float64)
+
+
+def test_zero_bovw_is_not_indexed():
+    index = InvertedIndex(8)
+    index.add('a', np.arange(8))
+    index.add('b', np.zeros(8))
+    assert len(index) == 1
+    assert 'b' not in index
+    assert index.query(np.arange(8), top_k=5)[0][0] == 'a'
+
+
+def test_empty_batch_leaves_index_unchanged():
+    index = InvertedIndex(8)
+    index.add_many([], np.zeros((0, 8)))
+    index.add_many(['a', 'b'], np.zeros((2, 8)))
+    assert len(index) == 0
+    assert index.ids == []
+    assert index.df.sum() == 0
+    assert index.query(np.ones(8)) == []
+
+
+def test_wrong_shape_is_rejected_before_any_change():
+    index = InvertedIndex(8)
+    with pytest.raises(ValueError):
+        index.add_many(['a', 'b'], np.ones((2, 7)))
+    with pytest.raises(ValueError):
+        index.add('a', np.ones(9))
+    assert len(index) == 0 and index.ids == []
+
+
+def test_removed_images_are_reclaimed():
+    bovws = random_bovws(400, 50)
+    index = InvertedIndex(50)
+    # Many rounds of adds and deletes: internal storage follows the live images only
+    for step in range(10):
+        index.add_many([f"{step}-{i}" for i in range(len(bovws))], bovws)
+        for i in range(len(bovws)):
+            index.remove(f"{step}-{i}")
+    index.add_many([f"last-{i}" for i in range(len(bovws))], bovws)
+    assert len(index.ids) <= 2 * len(bovws)
+    assert len(index.doc_words) == len(index.ids)
+
+    fresh = InvertedIndex(50)
+    fresh.add_many([f"last-{i}" for i in range(len(bovws))], bovws)
+    for query in bovws[:20]:
+        got, expected = index.query(query, top_k=5), fresh.query(query, top_k=5)
+        assert [image_id for image_id, _ in got] == [image_id for image_id, _ in expected]
+        assert np.allclose([score for _, score in got], [score for _, score in expected], atol=1e-6)